@@ -1,14 +1,15 @@
-import pandas as pd
 import seaborn as sns
 import matplotlib
 import matplotlib.pyplot as plt
 
+from entries import load_entries
+
 sns.set_theme(style="white")
 matplotlib.rcParams['font.family'] = 'DejaVu Sans'   # Change to the font you prefer
 matplotlib.rcParams['font.size'] = 12          # Adjust font size globally
 
-# Load CSV files
-df = pd.read_csv('entries.csv')
+# Load entries
+df = load_entries()
 df = df[df["alert"] == True]
 
 # Filter the DataFrame based on the label column
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from logger import read_entries
+
+
+def load_entries(name: str = "entries") -> pd.DataFrame:
+    """
+    Load the entries of a campaign, preferring the columnar files over the CSV export.
+    An Arrow stream cut short by a crash yields the batches before the cut.
+    """
+    for extension in [".arrow", ".parquet"]:
+        if os.path.exists(f"{name}{extension}"):
+            return read_entries(f"{name}{extension}").to_pandas()
+    return pd.read_csv(f"{name}.csv")
@@ -1,8 +1,8 @@
-import pandas as pd
+from entries import load_entries
 
-df = pd.read_csv("rq2.csv")
+df = load_entries()
 
-result = df.groupby(['round', 'exclusion'], as_index=False).agg(
+result = df.groupby(['round', 'exclude'], as_index=False).agg(
     new_value=('alert', lambda x: not x.all())  # True if any 'alert' is False
 )
 
@@ -1,8 +1,9 @@
-import pandas as pd
 from scipy import stats
 
-# Load CSV files
-df = pd.read_csv('entries.csv')
+from entries import load_entries
+
+# Load entries
+df = load_entries()
 df = df.groupby('round').filter(lambda group: group['alert'].all() and (group['time'] >= 0).all())
 
 # Filter the DataFrame based on the label column
@@ -0,0 +1,116 @@
+import os
+import json
+import random
+import hashlib
+
+from checkpoint import read_jsonl
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BaselineCache:
+    def __init__(self, path: str, falco_path: str, resample: float = 0.1, min_samples: int = 1, seed: int = None) -> None:
+        """
+        Cache of baseline outcomes for unmutated seed rules.
+        Outcomes are keyed by the rendered rule, Falco options, attack and Falco binary,
+        and appended to a JSON lines file as they are measured, so they carry over
+        between campaigns run with the same binary.
+
+        Whether a case reuses a baseline is decided by get() in campaign order, ahead of
+        the measurements of earlier cases: a baseline counts as available once enough
+        measurements of it are on file or were scheduled by earlier cases with schedule().
+        The cached outcome itself is drawn by sample() when the case is recorded, after
+        those earlier cases. get() always consumes the same random numbers, so decisions
+        replay from the seed.
+
+        Args:
+            path: path to the .jsonl file holding the outcomes
+            falco_path: path to the Falco binary, hashed into every key
+            resample: probability of re-measuring a baseline that is already cached
+            min_samples: number of measurements to take before serving from the cache
+            seed: for the resampling random number generator
+        """
+        self.path = path
+        self.falco_hash = file_hash(falco_path)
+        self.resample = resample
+        self.min_samples = min_samples
+        self.rng = random.Random(seed)
+        self.samples: dict[str, list[tuple[bool, float]]] = {}
+        # Measurements on file or scheduled, counted in campaign order
+        self.counts: dict[str, int] = {}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        records, torn = read_jsonl(path)
+        for record in records:
+            self.samples.setdefault(record["key"], []).append((record["alert"], record["time"]))
+        self.counts = {key: len(samples) for key, samples in self.samples.items()}
+        self.file = open(path, "a")
+        if torn:
+            self.file.write("\n")
+
+    def key(self, rule: str, options: list[str], attack: str) -> str:
+        digest = hashlib.sha256()
+        for part in [rule, "\0".join(options), attack, self.falco_hash]:
+            digest.update(hashlib.sha256(part.encode()).digest())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> float | None:
+        """
+        Decide whether the next case of key reuses a cached baseline or measures it.
+
+        Returns:
+            float: a draw to pass to sample() once the earlier cases are recorded,
+                or None if the baseline should be measured this time
+        """
+        resample, draw = self.rng.random(), self.rng.random()
+        if self.counts.get(key, 0) < self.min_samples or resample < self.resample:
+            return None
+        return draw
+
+    def schedule(self, key: str) -> None:
+        """Count a measurement of key that a case will put(), for the cases after it.
+        """
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def sample(self, key: str, draw: float) -> tuple[bool, float] | None:
+        """
+        Returns:
+            tuple: the cached (alert, alert_time) picked by draw among the measurements of key,
+                or None if the measurements scheduled before it all failed, in which case
+                the baseline must be measured after all
+        """
+        samples = self.samples.get(key)
+        if not samples:
+            return None
+        return samples[int(draw * len(samples))]
+
+    def lengths(self) -> dict[str, int]:
+        """Number of measurements of every key, for a checkpoint.
+        """
+        return {key: len(samples) for key, samples in self.samples.items()}
+
+    def restore(self, counts: dict[str, int], lengths: dict[str, int]) -> None:
+        """
+        Return to the decisions and measurements of a checkpoint, dropping the measurements
+        put after it, by cases that are run again or by other campaigns.
+
+        Args:
+            counts: measurements on file or scheduled, as get() counted them
+            lengths: measurements of every key, as returned by lengths()
+        """
+        self.counts = dict(counts)
+        self.samples = {key: self.samples[key][:length] for key, length in lengths.items() if key in self.samples}
+
+    def put(self, key: str, alert: bool, alert_time: float) -> None:
+        self.samples.setdefault(key, []).append((alert, alert_time))
+        self.file.write(json.dumps({"key": key, "alert": alert, "time": alert_time}) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+import tracemalloc
+
+from lark import Tree, Token
+
+base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, base_path)
+
+from falco_parser import FalcoParser
+from falco_ast import to_lark
+from transform import InsertDeadSubtrees
+from utils import load_syscalls, load_seeds_cached
+
+rule_path = os.path.join(base_path, "falco_rules.yaml")
+seed_path = os.path.join(base_path, "falco_seed.txt")
+syscalls_path = os.path.join(base_path, "syscalls", "x86_64.txt")
+cache_path = os.path.join(base_path, ".cache")
+ROUNDS = 20
+
+
+class LarkInsertDeadSubtrees(InsertDeadSubtrees):
+    """Previous engine: the same indexed mutation, editing lark Tree/Token objects in place.
+    """
+    MUTABLE = ("pred", "and_op", "or_op")
+
+    def __init__(self, *args) -> None:
+        super().__init__(*args)
+        self.syscall_tokens = {syscall: Token("UNQUOTED_STRING", syscall) for syscall in self.syscalls}
+
+    def transform(self, tree: Tree, blacklist_syscalls: set[str]) -> Tree:
+        self.whitelist_syscalls = sorted(self.syscalls.difference(blacklist_syscalls))
+        iterations = self.rng.randint(self.min_iter, self.max_iter)
+        tree = self._copy(tree)
+        index = [node for node in self._walk(tree) if node.data in self.MUTABLE]
+        for _ in range(iterations):
+            k = self.rng.binomialvariate(len(index), self.p)
+            for i in self.rng.sample(range(len(index)), k):
+                self._add_subtree(index, i)
+        return tree
+
+    def _copy(self, tree: Tree) -> Tree:
+        return Tree(tree.data, [self._copy(child) if isinstance(child, Tree) else child for child in tree.children])
+
+    def _walk(self, tree: Tree):
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed([child for child in node.children if isinstance(child, Tree)]))
+
+    def _add_subtree(self, index: list[Tree], i: int) -> None:
+        node = index[i]
+        op = "or_op" if self.rng.random() > 0.5 else "and_op"
+        add_pred = self.rng.choice([self._add_eq_pred, self._add_set_pred])
+        dead = add_pred(op == "or_op")
+        x = Tree(node.data, node.children)
+        children = [dead, Tree("group", [x]) if x.data != "pred" else x]
+        self.rng.shuffle(children)
+        op_node = Tree(op, children)
+        node.data = "group"
+        node.children = [op_node]
+        index[i] = op_node
+        index.append(x)
+        index.extend(child for child in self._walk(dead) if child.data == "pred")
+
+    def _add_eq_pred(self, or_op: bool) -> Tree:
+        ops = Token("EQ", "=") if or_op else Token("NEQ", "!=")
+        syscall = self.rng.choice(self.whitelist_syscalls)
+        field = Tree("field", [Token("CLASS", "evt"), Token("SUBCLASS", "type")])
+        return Tree("pred", [field, ops, Token("UNQUOTED_STRING", syscall)])
+
+    def _add_set_pred(self, or_op: bool) -> Tree:
+        k = self.rng.randint(1, len(self.whitelist_syscalls))
+        syscalls = self.rng.sample(self.whitelist_syscalls, k)
+        field = Tree("field", [Token("CLASS", "evt"), Token("SUBCLASS", "type")])
+        tokens = [self.syscall_tokens[syscall] for syscall in syscalls]
+        pred = Tree("pred", [field, Token("IN", "in"), Tree("set", tokens)])
+        return pred if or_op else Tree("not_op", [pred])
+
+
+def run(mutator, seeds) -> tuple[list, float, float, int]:
+    """
+    Mutate and serialize ROUNDS mutants of every seed, keeping all of them alive,
+    and measure time spent in each stage and the memory the mutants retain.
+    """
+    mutants, rules = [], []
+    mutate_time, serialize_time = 0, 0
+
+    tracemalloc.start()
+    for _ in range(ROUNDS):
+        for name, tree in seeds:
+            start = time.perf_counter()
+            mutants.append(mutator.transform(tree, blacklist_syscalls[name]))
+            mutate_time += time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    for mutant in mutants:
+        start = time.perf_counter()
+        rules.append(parser.to_rule(mutant))
+        serialize_time += time.perf_counter() - start
+
+    return rules, mutate_time, serialize_time, retained
+
+
+parser = FalcoParser()
+syscalls = load_syscalls(syscalls_path)
+seeds, blacklist_syscalls = load_seeds_cached(rule_path, seed_path, parser, cache_path)
+lark_seeds = [(name, to_lark(tree)) for name, tree in seeds]
+count = ROUNDS * len(seeds)
+
+lark_rules, lark_mutate, lark_serialize, lark_retained = run(LarkInsertDeadSubtrees(syscalls, (2, 10), 0.1, 42), lark_seeds)
+ast_rules, ast_mutate, ast_serialize, ast_retained = run(InsertDeadSubtrees(syscalls, (2, 10), 0.1, 42), seeds)
+
+print(f"Mutants:        {count} ({sum(map(len, ast_rules))} chars)")
+print(f"Lark mutate:    {count / lark_mutate:.1f} mutants/s, serialize {lark_serialize * 1000:.1f} ms")
+print(f"AST mutate:     {count / ast_mutate:.1f} mutants/s, serialize {ast_serialize * 1000:.1f} ms ({lark_mutate / ast_mutate:.1f}x)")
+print(f"Lark memory:    {lark_retained / count / 1024:.1f} KiB/mutant")
+print(f"AST memory:     {ast_retained / count / 1024:.1f} KiB/mutant ({lark_retained / ast_retained:.1f}x less)")
+print(f"Same rules:     {lark_rules == ast_rules}")
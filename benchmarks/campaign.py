@@ -0,0 +1,126 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, base_path)
+
+import campaign
+from campaign import Campaign, CampaignConfig, OptionSet
+from logger import RQ1Entry, read_entries
+from subscriber import Alert
+
+rule_path = os.path.join(base_path, "falco_rules.yaml")
+seed_path = os.path.join(base_path, "falco_seed.txt")
+syscalls_path = os.path.join(base_path, "syscalls", "x86_64.txt")
+ROUNDS = 40
+CRASH_AT = 30
+
+
+# Falco, its alerts and the attacks are simulated, every rule alerts once its session loads
+class Supervisor:
+    loads = 0
+    failures = set()
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.returncode = 0
+
+    def load(self, rule_file: str, options: list[str] = []) -> None:
+        Supervisor.loads += 1
+        if Supervisor.loads in Supervisor.failures:
+            raise RuntimeError("Falco failed to start")
+
+    def close(self) -> None:
+        pass
+
+
+class Subscriber:
+    def __init__(self, *args, **kwargs) -> None:
+        pass
+
+    def alerts(self, tag: str, rule_names: list[str], *args) -> dict[str, tuple[bool, float]]:
+        return {rule_name: (True, 0.01) for rule_name in rule_names}
+
+    def first(self, rule: str, tag: str, timeout: float) -> Alert:
+        return Alert("", 0, 0, time.time_ns(), time.time_ns())
+
+    def clear(self, tag: str) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class Generator:
+    attacks = 0
+    crash_at = None
+
+    def __init__(self, *args, **kwargs) -> None:
+        pass
+
+    def run(self, action: str) -> None:
+        Generator.attacks += 1
+        if Generator.attacks == Generator.crash_at:
+            os._exit(3)
+
+    def close(self) -> None:
+        pass
+
+
+campaign.FalcoSupervisor = Supervisor
+campaign.AlertSubscriber = Subscriber
+campaign.EventGenerator = Generator
+campaign.falco.Client = lambda *args, **kwargs: None
+campaign.wait_ready = lambda *args, **kwargs: 0.0
+campaign.remove_containers = lambda *args, **kwargs: None
+
+
+def run(name: str, seed_path: str, cache_path: str) -> list[tuple]:
+    config = CampaignConfig(
+        name=name, entry_type=RQ1Entry, option_sets=[OptionSet()], rounds=ROUNDS,
+        static_check=False, dedup=False
+    )
+    # Any file stands in for the Falco binary, which is only hashed
+    test = Campaign(config, __file__, "falco.yaml", rule_path, seed_path, syscalls_path, cache_path)
+    test.logger.logger.handlers.clear()
+    test.run()
+    entries = read_entries(test.logger.entries_path).to_pylist()
+    shutil.rmtree(test.logger.logs_path)
+    os.remove(test.checkpoint.path)
+    return [(entry["round"], entry["seed"], entry["label"], entry["alert"], entry["cached"]) for entry in entries]
+
+
+if __name__ == "__main__" and len(sys.argv) == 3:
+    # Child process of a crashing run
+    Generator.crash_at = CRASH_AT
+    run("resume", sys.argv[1], sys.argv[2])
+    sys.exit(0)
+
+# One seed, so every round reuses the baseline of the first, whose session fails
+work_path = tempfile.mkdtemp()
+single_seed_path = os.path.join(work_path, "seed.txt")
+with open(seed_path) as f, open(single_seed_path, "w") as single:
+    single.write(f.readline())
+
+Supervisor.loads, Supervisor.failures = 0, {1}
+entries = run("failed-baseline", single_seed_path, os.path.join(work_path, "cache"))
+rounds = {(round, label) for round, _, label, _, _ in entries}
+missing = [(round, label) for round in range(1, ROUNDS + 1) for label in ["r", "r'"] if (round, label) not in rounds]
+cached = sum(entry[4] for entry in entries)
+print(f"Failed baseline:  {len(entries)}/{2 * ROUNDS} entries, {cached} cached, {Supervisor.loads} sessions")
+assert not missing, f"entries missing after a failed baseline: {missing}"
+
+# A resume makes the same baseline decisions as an uninterrupted run, although the
+# crashed run measured baselines after its last checkpoint
+reference = run("resume", seed_path, os.path.join(work_path, "reference"))
+cache_path = os.path.join(work_path, "resumed")
+crashed = subprocess.run([sys.executable, __file__, seed_path, cache_path])
+assert crashed.returncode == 3, "the run did not crash"
+resumed = run("resume", seed_path, cache_path)
+cached = sum(entry[4] for entry in reference)
+print(f"Resume:           {len(resumed)}/{len(reference)} entries, {cached} cached")
+assert resumed == reference, "resumed entries differ from an uninterrupted run"
+shutil.rmtree(work_path)
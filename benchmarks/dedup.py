@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+import random
+
+base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, base_path)
+
+from falco_parser import FalcoParser
+from transform import InsertDeadSubtrees
+from equivalence import EquivalenceChecker
+from dedup import canonicalize, structural_hash, test_key
+from utils import load_syscalls, load_seeds_cached
+
+rule_path = os.path.join(base_path, "falco_rules.yaml")
+seed_path = os.path.join(base_path, "falco_seed.txt")
+syscalls_path = os.path.join(base_path, "syscalls", "x86_64.txt")
+cache_path = os.path.join(base_path, ".cache")
+ROUNDS = 2000
+
+parser = FalcoParser()
+syscalls = load_syscalls(syscalls_path)
+seeds, blacklist_syscalls = load_seeds_cached(rule_path, seed_path, parser, cache_path)
+mutator = InsertDeadSubtrees(syscalls, (2, 10), 0.1, 42)
+checker = EquivalenceChecker(syscalls)
+sample_rng = random.Random(42)
+
+# Canonical forms parse back to the same hash
+round_trips = sum(
+    structural_hash(parser.to_tree(parser.to_rule(canonical))) == digest
+    for canonical, digest in (canonicalize(tree) for _, tree in seeds)
+)
+
+# Same sampling as the campaign: count test cases that would run twice
+seen, duplicates, executed, elapsed = set(), 0, 0, 0
+for _ in range(ROUNDS):
+    name, tree = sample_rng.choice(seeds)
+    tree_prime = mutator.transform(tree, blacklist_syscalls[name])
+    if not checker.equivalent(tree, tree_prime): continue
+
+    executed += 1
+    start = time.perf_counter()
+    key = test_key(tree, tree_prime)
+    elapsed += time.perf_counter() - start
+    duplicates += key in seen
+    seen.add(key)
+
+print(f"Round trips:  {round_trips}/{len(seeds)} seeds")
+print(f"Executed:     {executed}/{ROUNDS} rounds")
+print(f"Duplicates:   {duplicates} ({duplicates / executed:.1%} of executed)")
+print(f"Key:          {elapsed / executed * 1e6:.0f} us/mutant")
@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+
+base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, base_path)
+
+from falco_parser import FalcoParser
+from falco_ast import Rule, Or, Group, Pred, Value
+from transform import InsertDeadSubtrees
+from equivalence import EquivalenceChecker
+from utils import load_syscalls, load_seeds_cached
+
+rule_path = os.path.join(base_path, "falco_rules.yaml")
+seed_path = os.path.join(base_path, "falco_seed.txt")
+syscalls_path = os.path.join(base_path, "syscalls", "x86_64.txt")
+cache_path = os.path.join(base_path, ".cache")
+ROUNDS = 20
+
+parser = FalcoParser()
+syscalls = load_syscalls(syscalls_path)
+seeds, blacklist_syscalls = load_seeds_cached(rule_path, seed_path, parser, cache_path)
+mutator = InsertDeadSubtrees(syscalls, (2, 10), 0.1, 42)
+checker = EquivalenceChecker(syscalls)
+
+# Every seed is equivalent to itself, and a top-level "or evt.type = <unused>" never is
+identity = all(checker.equivalent(tree, tree) for _, tree in seeds)
+live = sum(
+    checker.equivalent(tree, Rule(Or(Group(tree.children[0]), Pred("evt.type", Value("EQ", "="), Value("UNQUOTED_STRING", min(syscalls - blacklist_syscalls[name]))))))
+    for name, tree in seeds
+)
+
+proven, elapsed = 0, 0
+for _ in range(ROUNDS):
+    for name, tree in seeds:
+        tree_prime = mutator.transform(tree, blacklist_syscalls[name])
+        start = time.perf_counter()
+        proven += checker.equivalent(tree, tree_prime)
+        elapsed += time.perf_counter() - start
+
+count = ROUNDS * len(seeds)
+print(f"Mutants:      {count}")
+print(f"Proven:       {proven} ({proven / count:.0%}), {count - proven} rejected")
+print(f"Check:        {elapsed / count * 1e6:.0f} us/mutant")
+print(f"Identity:     {identity}")
+print(f"Live missed:  {live}/{len(seeds)}")
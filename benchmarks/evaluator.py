@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import random
+
+base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, base_path)
+
+from falco_parser import FalcoParser
+from falco_ast import Pred, Set, walk
+from transform import InsertDeadSubtrees, ExtractSyscalls
+from evaluator import ConditionCompiler, TableEvaluator, literal
+from utils import load_syscalls, load_seeds_cached
+
+rule_path = os.path.join(base_path, "falco_rules.yaml")
+seed_path = os.path.join(base_path, "falco_seed.txt")
+syscalls_path = os.path.join(base_path, "syscalls", "x86_64.txt")
+cache_path = os.path.join(base_path, ".cache")
+ROUNDS = 20
+EVENTS = 1000
+
+parser = FalcoParser()
+syscalls = load_syscalls(syscalls_path)
+seeds, blacklist_syscalls = load_seeds_cached(rule_path, seed_path, parser, cache_path)
+mutator = InsertDeadSubtrees(syscalls, (2, 10), 0.1, 42)
+rng = random.Random(42)
+
+# Field values are drawn from the literals of every seed, so predicates hit and miss
+pool: dict[str, list[str]] = {}
+for _, tree in seeds:
+    for node in walk(tree):
+        if isinstance(node, Pred) and node.value is not None:
+            values = node.value.elements if isinstance(node.value, Set) else [node.value]
+            pool.setdefault(node.field, []).extend(literal(value) for value in values)
+
+
+def events(tree, whitelist: list[str]) -> list[dict]:
+    """
+    Events of the seed's types, which is all Falco passes it, and of the whitelist types
+    the dead subtrees test, so the dead predicates are true on some events and false on others.
+    """
+    types = sorted(ExtractSyscalls().visit(tree)) or whitelist
+    return [
+        {
+            **{field: rng.choice(values) for field, values in pool.items() if rng.random() < 0.9},
+            "evt.type": rng.choice(types if rng.random() < 0.5 else whitelist)
+        }
+        for _ in range(EVENTS)
+    ]
+
+compiler = ConditionCompiler()
+pairs, disagreements, mismatches, compile_time, elapsed, table_elapsed = 0, 0, 0, 0, 0, 0
+for name, tree in seeds:
+    trace = events(tree, sorted(syscalls - blacklist_syscalls[name]))
+    table = TableEvaluator(trace)
+    condition = compiler.compile(tree)
+    for _ in range(ROUNDS):
+        tree_prime = mutator.transform(tree, blacklist_syscalls[name])
+        start = time.perf_counter()
+        condition_prime = compiler.compile(tree_prime)
+        compile_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = [(condition(event), condition_prime(event)) for event in trace]
+        elapsed += time.perf_counter() - start
+        disagreements += sum(a != b for a, b in results)
+        pairs += len(trace)
+
+        # The table evaluates the seed again, as screening a fresh table would
+        start = time.perf_counter()
+        mask, mask_prime = table.evaluate(tree), table.evaluate(tree_prime)
+        table_elapsed += time.perf_counter() - start
+        mismatches += sum((a, b) != r for a, b, r in zip(mask, mask_prime, results))
+
+count = ROUNDS * len(seeds)
+print(f"Mutants:       {count}")
+print(f"Pairs:         {pairs} ({EVENTS} events/mutant)")
+print(f"Compile:       {compile_time / count * 1e6:.0f} us/mutant")
+print(f"Evaluate:      {pairs / elapsed * 60:.3g} pairs/minute")
+print(f"Table:         {pairs / table_elapsed * 60:.3g} pairs/minute")
+print(f"Mismatches:    {mismatches}")
+print(f"Disagreements: {disagreements}")
+assert mismatches == 0, "the table and the compiled conditions disagree"
+assert disagreements, "no event reaches a mutated branch"
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import tracemalloc
+
+import yaml
+from lark import Tree, v_args
+
+base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, base_path)
+
+from falco_parser import FalcoParser, ExpandMarcos
+
+rule_path = os.path.join(base_path, "falco_rules.yaml")
+REPEAT = 5
+
+
+class UncachedExpandMarcos(ExpandMarcos):
+    """Previous behaviour: parse and expand the macro body at every reference.
+    """
+    @v_args(tree=True)
+    def MACRO(self, name: str):
+        subtree: Tree = self.parser.to_tree(self.macros[name])
+        subtree = self.transform(subtree)
+        return subtree.children[-1]
+
+
+with open(rule_path) as f:
+    items = yaml.safe_load(f)
+macros = {item["macro"]: " ".join(item["condition"].split()) for item in items if "macro" in item}
+conditions = [" ".join(item["condition"].split()) for item in items if "rule" in item]
+
+parser = FalcoParser()
+trees = []
+for condition in conditions:
+    try:
+        trees.append(parser.to_tree(condition))
+    except Exception:
+        pass
+
+
+def expand_all(expander: ExpandMarcos) -> list:
+    expanded = []
+    for tree in trees:
+        try:
+            expanded.append(expander.transform(tree))
+        except KeyError:
+            pass
+    return expanded
+
+
+def measure(expander_class: type) -> tuple[list, float, float, int]:
+    """
+    Time a cold expansion of every rule and a warm one reusing the same expander
+    (best of REPEAT), then measure the memory retained by the expanded trees.
+    """
+    cold, warm = float("inf"), float("inf")
+    for _ in range(REPEAT):
+        expander = expander_class(macros, parser)
+        start = time.perf_counter()
+        expand_all(expander)
+        cold = min(cold, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        expand_all(expander)
+        warm = min(warm, time.perf_counter() - start)
+
+    tracemalloc.start()
+    expanded = expand_all(expander_class(macros, parser))
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return expanded, cold, warm, retained
+
+
+uncached, uncached_cold, uncached_warm, uncached_memory = measure(UncachedExpandMarcos)
+cached, cached_cold, cached_warm, cached_memory = measure(ExpandMarcos)
+
+print(f"Rules:     {len(trees)} ({len(cached)} expanded), {len(macros)} macros")
+print(f"Uncached:  cold {uncached_cold * 1000:.1f} ms, warm {uncached_warm * 1000:.1f} ms, {uncached_memory / 2**10:.0f} KiB")
+print(f"Cached:    cold {cached_cold * 1000:.1f} ms, warm {cached_warm * 1000:.1f} ms, {cached_memory / 2**10:.0f} KiB")
+print(f"Identical: {uncached == cached}")
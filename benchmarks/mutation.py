@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+
+from lark import Tree, Token, Transformer, v_args
+
+base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, base_path)
+
+from falco_parser import FalcoParser
+from transform import InsertDeadSubtrees
+from falco_ast import to_lark
+from utils import load_syscalls, load_seeds_cached
+
+rule_path = os.path.join(base_path, "falco_rules.yaml")
+seed_path = os.path.join(base_path, "falco_seed.txt")
+syscalls_path = os.path.join(base_path, "syscalls", "x86_64.txt")
+cache_path = os.path.join(base_path, ".cache")
+ROUNDS = 20
+
+
+class TransformerInsertDeadSubtrees(Transformer):
+    """Previous engine: one full Transformer pass over a lark tree per iteration.
+    """
+    def __init__(self, mutator: InsertDeadSubtrees) -> None:
+        super().__init__()
+        self.mutator = mutator
+        self.rng = mutator.rng
+
+    def transform(self, tree: Tree, blacklist_syscalls: set[str]) -> Tree:
+        self.mutator.whitelist_syscalls = sorted(self.mutator.syscalls.difference(blacklist_syscalls))
+        for _ in range(self.rng.randint(self.mutator.min_iter, self.mutator.max_iter)):
+            tree = super().transform(tree)
+        return tree
+
+    @v_args(tree=True)
+    def pred(self, tree: Tree) -> Tree:
+        return self._add_subtree(tree)
+
+    @v_args(tree=True)
+    def and_op(self, tree: Tree) -> Tree:
+        return self._add_subtree(tree)
+
+    @v_args(tree=True)
+    def or_op(self, tree: Tree) -> Tree:
+        return self._add_subtree(tree)
+
+    def _add_subtree(self, x: Tree) -> Tree:
+        if self.rng.random() > self.mutator.p: return x
+        op = "or_op" if self.rng.random() > 0.5 else "and_op"
+        add_pred = self.rng.choice([self._add_eq_pred, self._add_set_pred])
+        children = [add_pred(op == "or_op"), x]
+        self.rng.shuffle(children)
+        return Tree(op, children)
+
+    def _add_eq_pred(self, or_op: bool) -> Tree:
+        ops = Token("EQ", "=") if or_op else Token("NEQ", "!=")
+        syscall = self.rng.choice(self.mutator.whitelist_syscalls)
+        field = Tree("field", [Token("CLASS", "evt"), Token("SUBCLASS", "type")])
+        return Tree("pred", [field, ops, Token("UNQUOTED_STRING", syscall)])
+
+    def _add_set_pred(self, or_op: bool) -> Tree:
+        k = self.rng.randint(1, len(self.mutator.whitelist_syscalls))
+        syscalls = self.rng.sample(self.mutator.whitelist_syscalls, k)
+        field = Tree("field", [Token("CLASS", "evt"), Token("SUBCLASS", "type")])
+        pred = Tree("pred", [field, Token("IN", "in"), Tree("set", [Token("UNQUOTED_STRING", syscall) for syscall in syscalls])])
+        return pred if or_op else Tree("not_op", [pred])
+
+
+def count_nodes(tree) -> int:
+    """Count Tree nodes in lark terms, so both engines report comparable sizes.
+    """
+    if not isinstance(tree, Tree):
+        tree = to_lark(tree)
+    return sum(1 for _ in tree.iter_subtrees())
+
+
+def run(mutator, seeds) -> tuple[float, int]:
+    nodes, elapsed = 0, 0
+    for _ in range(ROUNDS):
+        for name, tree in seeds:
+            start = time.perf_counter()
+            mutant = mutator.transform(tree, blacklist_syscalls[name])
+            elapsed += time.perf_counter() - start
+            nodes += count_nodes(mutant)
+    return ROUNDS * len(seeds) / elapsed, nodes
+
+parser = FalcoParser()
+syscalls = load_syscalls(syscalls_path)
+seeds, blacklist_syscalls = load_seeds_cached(rule_path, seed_path, parser, cache_path)
+
+lark_seeds = [(name, to_lark(tree)) for name, tree in seeds]
+
+legacy_rate, legacy_nodes = run(TransformerInsertDeadSubtrees(InsertDeadSubtrees(syscalls, (2, 10), 0.1, 42)), lark_seeds)
+indexed_rate, indexed_nodes = run(InsertDeadSubtrees(syscalls, (2, 10), 0.1, 42), seeds)
+
+# Same seed, same mutants
+a, b = InsertDeadSubtrees(syscalls, (2, 10), 0.1, 42), InsertDeadSubtrees(syscalls, (2, 10), 0.1, 42)
+reproducible = all(
+    parser.to_rule(a.transform(tree, blacklist_syscalls[name])) == parser.to_rule(b.transform(tree, blacklist_syscalls[name]))
+    for name, tree in seeds
+)
+
+print(f"Mutants:      {ROUNDS * len(seeds)}")
+print(f"Transformer:  {legacy_rate:.1f} mutants/s ({legacy_nodes} nodes)")
+print(f"Indexed:      {indexed_rate:.1f} mutants/s ({indexed_nodes} nodes, {indexed_rate / legacy_rate:.1f}x)")
+print(f"Reproducible: {reproducible}")
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+
+import yaml
+
+base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, base_path)
+
+from falco_parser import FalcoParser, FastParseError
+
+rule_path = os.path.join(base_path, "falco_rules.yaml")
+REPEAT = 5
+
+# All rule and macro conditions, normalized the same way as load_seeds
+with open(rule_path) as f:
+    items = yaml.safe_load(f)
+conditions = [" ".join(item["condition"].split()) for item in items if "condition" in item]
+
+earley = FalcoParser(fast=False)
+fast = FalcoParser(fast=True)
+
+
+def parse_all(parser: FalcoParser) -> tuple[list, float]:
+    trees = []
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        trees = []
+        for condition in conditions:
+            try:
+                trees.append(parser.to_tree(condition))
+            except Exception:
+                trees.append(None)
+    return trees, (time.perf_counter() - start) / REPEAT
+
+
+earley_trees, earley_time = parse_all(earley)
+fast_trees, fast_time = parse_all(fast)
+
+fallbacks = 0
+for condition in conditions:
+    try:
+        fast.fast_parser.parse(condition)
+    except FastParseError:
+        fallbacks += 1
+
+mismatches = sum(1 for a, b in zip(earley_trees, fast_trees) if a != b)
+
+print(f"Conditions:  {len(conditions)}")
+print(f"Earley:      {earley_time * 1000:.1f} ms")
+print(f"Fast:        {fast_time * 1000:.1f} ms ({earley_time / fast_time:.1f}x)")
+print(f"Fallbacks:   {fallbacks}")
+print(f"Mismatches:  {mismatches}")
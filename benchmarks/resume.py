@@ -0,0 +1,72 @@
+import os
+import sys
+import random
+import tempfile
+import subprocess
+
+base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, base_path)
+
+from logger import EntryWriter, RQ1Entry, read_entries
+from checkpoint import Checkpoint, rng_state, set_rng_state
+from dedup import SeenSet
+
+ROUNDS = 60
+CRASH_AT = 37
+
+
+def campaign(work_path: str, format: str, crash_at: int = None) -> list[dict]:
+    """
+    The journaling of a Campaign without Falco: every round draws from an RNG, dedups
+    and writes two entries. A crash kills the process without any cleanup.
+    """
+    checkpoint = Checkpoint(os.path.join(work_path, "checkpoint.jsonl"), {"format": format})
+    logs_path = checkpoint.logs_path or os.path.join(work_path, "logs")
+    os.makedirs(logs_path, exist_ok=True)
+    entries = EntryWriter(
+        os.path.join(logs_path, "entries"), RQ1Entry, format, batch_size=5,
+        resume=checkpoint.resumed, on_flush=checkpoint.commit
+    )
+    checkpoint.start(logs_path)
+    rng = random.Random(42)
+    seen = SeenSet(os.path.join(logs_path, "seen.txt"))
+
+    for i in range(ROUNDS):
+        if checkpoint.skip((i,)): continue
+        state = checkpoint.restore((i,))
+        if state is not None:
+            set_rng_state(rng, state["rng"])
+            seen.truncate(state["seen"])
+        entries.mark()
+        checkpoint.begin((i,), {"rng": rng_state(rng), "seen": seen.count})
+
+        value = rng.random()
+        if not seen.add(str(round(value, 2)).encode()): continue
+        entries.write(RQ1Entry(i, "seed", "r", 1, True, value, 0))
+        if i == crash_at:
+            os._exit(1)
+        entries.write(RQ1Entry(i, "seed", "r'", 1, True, value, 0))
+
+    entries.mark()
+    entries.close()
+    checkpoint.finish()
+    return read_entries(entries.path).to_pylist()
+
+
+if __name__ == "__main__" and len(sys.argv) == 4:
+    # Child process of a crashing run
+    campaign(sys.argv[1], sys.argv[2], int(sys.argv[3]))
+    sys.exit(0)
+
+# Every format resumes to the same entries as an uninterrupted run
+for format in ["arrow", "parquet", "csv"]:
+    reference = campaign(tempfile.mkdtemp(), format)
+
+    work_path = tempfile.mkdtemp()
+    crashed = subprocess.run([sys.executable, __file__, work_path, format, str(CRASH_AT)])
+    assert crashed.returncode == 1, f"{format}: the run did not crash"
+    flushed = len(read_entries(os.path.join(work_path, "logs", f"entries.{format}")))
+    resumed = campaign(work_path, format)
+
+    assert resumed == reference, f"{format}: resumed entries differ from an uninterrupted run"
+    print(f"{format + ':':9} {flushed} entries flushed before the crash, {len(resumed)}/{len(reference)} after resuming")
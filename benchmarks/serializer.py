@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+
+base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, base_path)
+
+from falco_parser import FalcoParser
+from transform import ExtractSyscalls, InsertDeadSubtrees
+from utils import load_syscalls, load_seeds
+
+rule_path = os.path.join(base_path, "falco_rules.yaml")
+seed_path = os.path.join(base_path, "falco_seed.txt")
+syscalls_path = os.path.join(base_path, "syscalls", "x86_64.txt")
+ROUNDS = 2
+
+parser = FalcoParser()
+mutator = InsertDeadSubtrees(load_syscalls(syscalls_path), iterations=(2, 10), p=0.1, seed=42)
+seeds = load_seeds(rule_path, seed_path, parser)
+
+# Round trip: seed trees survive serialize -> parse unchanged
+round_trips = sum(1 for _, tree in seeds if parser.to_tree(parser.to_rule(tree)) == tree)
+
+# Seeds and mutants, serialized by both the Reconstructor and the Serializer
+trees = [tree for _, tree in seeds]
+for _ in range(ROUNDS):
+    trees.extend(mutator.transform(tree, ExtractSyscalls().visit(tree)) for _, tree in seeds)
+
+reconstructor_time, serializer_time, mismatches, length = 0, 0, 0, 0
+for tree in trees:
+    start = time.perf_counter()
+    expected = parser.reconstructor.reconstruct(tree)
+    reconstructor_time += time.perf_counter() - start
+
+    start = time.perf_counter()
+    rule = parser.to_rule(tree)
+    serializer_time += time.perf_counter() - start
+
+    mismatches += rule != expected
+    length += len(rule)
+
+print(f"Trees:          {len(trees)} ({length} chars)")
+print(f"Round trips:    {round_trips}/{len(seeds)} seeds")
+print(f"Reconstructor:  {reconstructor_time * 1000:.1f} ms")
+print(f"Serializer:     {serializer_time * 1000:.1f} ms ({reconstructor_time / serializer_time:.0f}x)")
+print(f"Mismatches:     {mismatches}")
+
+assert round_trips == len(seeds), f"{len(seeds) - round_trips} seeds changed through serialize -> parse"
+assert mismatches == 0, f"{mismatches} trees serialized differently from the Reconstructor"
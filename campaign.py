@@ -0,0 +1,697 @@
+import os
+import re
+import time
+import queue
+import atexit
+import random
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator
+
+import falco
+
+from logger import Logger
+from falco_ast import Node
+from falco_parser import FalcoParser
+from supervisor import FalcoSupervisor
+from transform import InsertDeadSubtrees
+from equivalence import EquivalenceChecker
+from dedup import SeenSet, test_key
+from baseline import BaselineCache
+from subscriber import AlertSubscriber, Alert
+from latency import LatencyTracker
+from timing import StageTimer
+from checkpoint import Checkpoint, rng_state, set_rng_state
+from eventgen import EventGenerator
+from utils import (
+    SCOPE_MACRO,
+    load_syscalls,
+    load_seeds_cached,
+    write_scope,
+    write_rules,
+    run_falco,
+    wait_ready,
+    stop_falco,
+    remove_containers
+)
+
+
+@dataclass
+class OptionSet:
+    """Falco command line options a batch of rounds runs with.
+    """
+    options: list[str] = field(default_factory=list)
+    # Extra entry fields, e.g. n and exclude of RQ2Entry
+    fields: dict = field(default_factory=dict)
+    # Shown in log lines and prefixed to sample file names
+    name: str = ""
+
+
+@dataclass
+class CampaignConfig:
+    name: str
+    entry_type: type
+    option_sets: list[OptionSet]
+    rounds: int
+    rng_seed: int = 42
+    single_session: bool = True
+    persistent: bool = True
+    static_check: bool = True
+    dedup: bool = True
+    cache_baselines: bool = True
+    # Probability of re-measuring a cached baseline, and measurements to take before reusing one
+    baseline_resample: float = 0.1
+    baseline_min_samples: int = 1
+    adaptive_timeout: bool = True
+    # Range of mutation passes per mutant, and probability of a dead subtree at each node
+    mutation_iterations: tuple[int, int] = (2, 10)
+    mutation_p: float = 0.1
+    # Depth of the pipeline queues, one for all or one per queue (planned, rendered, executed)
+    queue_size: int | list[int] = 4
+    # Cases whose rules are loaded into one Falco session and attacked together
+    batch_size: int = 1
+    # Isolated Falco instances running batches in parallel
+    lanes: int = 1
+
+
+@dataclass
+class Case:
+    """A round of the campaign as it moves through the pipeline.
+    """
+    index: tuple[int, int]
+    round: int
+    option_set: OptionSet
+    state: dict
+    seed_name: str = None
+    tree: Node = None
+    tree_prime: Node = None
+    rule: str = None
+    # Rules left to run in Falco, as (tree, label)
+    runs: list[tuple[Node, str]] = field(default_factory=list)
+    baseline_key: str = None
+    # Set if the seed reuses a cached baseline, which is drawn when the case is recorded
+    baseline_draw: float = None
+    baseline: tuple[bool, float] = None
+    timer: StageTimer = field(default_factory=StageTimer)
+    logs: list[str] = field(default_factory=list)
+    abort: bool = False
+
+    def log(self, message: str) -> None:
+        self.logs.append(message)
+
+
+@dataclass
+class Session:
+    """One Falco session of a batch, and its outcome.
+    """
+    # Rule names mapped to the case and label they run
+    members: dict[str, tuple[Case, str]] = field(default_factory=dict)
+    trees: dict[str, Node] = field(default_factory=dict)
+    timer: StageTimer = field(default_factory=StageTimer)
+    rules: dict[str, str] = field(default_factory=dict)
+    rule_file: str = None
+    alerts: dict[str, tuple[bool, float]] = None
+    details: dict[str, Alert] = field(default_factory=dict)
+    returncode: int = -9
+    abort: bool = False
+
+    @property
+    def seed_names(self) -> list[str]:
+        return list(dict.fromkeys(case.seed_name for case, _ in self.members.values()))
+
+
+@dataclass
+class Batch:
+    """Consecutive cases of one option set that share their Falco sessions.
+    """
+    cases: list[Case]
+    options: list[str]
+    sessions: list[Session] = field(default_factory=list)
+    logs: list[str] = field(default_factory=list)
+
+    def log(self, message: str) -> None:
+        self.logs.append(message)
+
+
+class Lane:
+    def __init__(self, index: int, lanes: int, falco_path: str, falco_config_path: str) -> None:
+        """
+        Isolated execution resources: a Falco instance, its alert subscription and an
+        event-generator container. With several lanes, each Falco serves gRPC on its own
+        socket, writes file outputs and serves its webserver apart, and loads a macro that
+        scopes every rule to the lane's container, so lanes never see each other's attacks.
+        A single lane runs with the defaults and unscoped rules.
+        """
+        self.index = index
+        self.dir = tempfile.mkdtemp(prefix=f"falco-lane-{index}-")
+        os.chmod(self.dir, 0o777)
+
+        if lanes == 1:
+            self.socket_path = "/run/falco/falco.sock"
+            self.container_name = "falco-eventgen"
+            self.options = []
+            self.rule_files = []
+        else:
+            self.socket_path = f"/run/falco/falco-{index}.sock"
+            self.container_name = f"falco-eventgen-{index}"
+            self.options = [
+                "-o", f"grpc.bind_address=unix://{self.socket_path}",
+                "-o", f"webserver.listen_port={8766 + index}",
+                "-o", f"file_output.filename={os.path.join(self.dir, 'events.txt')}"
+            ]
+            scope_file = os.path.join(self.dir, "scope.yaml")
+            write_scope(scope_file, self.container_name)
+            self.rule_files = [scope_file]
+
+        self.endpoint = f"unix://{self.socket_path}"
+        self.supervisor = FalcoSupervisor(falco_path, falco_config_path, rule_files=self.rule_files)
+        self.subscriber = AlertSubscriber(endpoint=self.endpoint)
+        self.generator = EventGenerator(name=self.container_name)
+
+    def close(self) -> None:
+        self.generator.close()
+        self.subscriber.close()
+        self.supervisor.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+class _Failure:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+_DONE = object()
+
+
+def pipeline(source: Iterable, stages: list[Callable], queue_size: int | list[int] = 4, workers: list[int] = None) -> Iterator:
+    """
+    Run a source and stages in threads connected by bounded queues, and yield the
+    output of the last stage in source order. Each stage handles one item at a time per
+    worker thread, so consecutive items overlap across stages, and a stage with several
+    workers handles several items at once. A stage that raises stops the pipeline and
+    the error is raised here.
+
+    Args:
+        queue_size: depth of every queue, or of each of the len(stages) + 1 queues
+        workers: number of worker threads per stage, one each by default
+    """
+    workers = workers or [1] * len(stages)
+    sizes = [queue_size] * (len(stages) + 1) if isinstance(queue_size, int) else queue_size
+    if len(sizes) != len(stages) + 1:
+        raise ValueError(f"Expected {len(stages) + 1} queue sizes, got {len(sizes)}")
+    queues = [queue.Queue(size) for size in sizes]
+    stop = threading.Event()
+
+    def put(q: queue.Queue, item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce() -> None:
+        try:
+            for position, item in enumerate(source):
+                if not put(queues[0], (position, item)): return
+        except BaseException as e:
+            put(queues[0], _Failure(e))
+            return
+        put(queues[0], _DONE)
+
+    def work(stage: Callable, inbox: queue.Queue, outbox: queue.Queue, remaining: list[int], lock: threading.Lock) -> None:
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                # The last worker of the stage to finish passes the end on
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    put(outbox, _DONE)
+                else:
+                    put(inbox, _DONE)
+                return
+
+            if not isinstance(item, _Failure):
+                position, item = item
+                try:
+                    item = (position, stage(item))
+                except BaseException as e:
+                    item = _Failure(e)
+            if not put(outbox, item) or isinstance(item, _Failure):
+                return
+
+    threads = [threading.Thread(target=produce, daemon=True)]
+    for stage, count, inbox, outbox in zip(stages, workers, queues, queues[1:]):
+        remaining, lock = [count], threading.Lock()
+        for _ in range(count):
+            threads.append(threading.Thread(target=work, args=(stage, inbox, outbox, remaining, lock), daemon=True))
+    for thread in threads:
+        thread.start()
+
+    # Items finished out of order by parallel workers wait here for their turn
+    finished = {}
+    position = 0
+    try:
+        while True:
+            item = queues[-1].get()
+            if item is _DONE: return
+            if isinstance(item, _Failure): raise item.error
+            finished[item[0]] = item[1]
+            while position in finished:
+                yield finished.pop(position)
+                position += 1
+    finally:
+        stop.set()
+
+
+class Campaign:
+    def __init__(
+        self,
+        config: CampaignConfig,
+        falco_path: str,
+        falco_config_path: str,
+        rule_path: str,
+        seed_path: str,
+        syscalls_path: str,
+        cache_path: str
+    ) -> None:
+        """
+        Metamorphic testing campaign: mutate seed rules, run the seed r and mutant r' in
+        Falco against the seed's attack, and log whether each alerted.
+        Rounds go through a pipeline of stages connected by bounded queues:
+        mutation (incl. static check, dedup and baseline lookup), rendering of rule files,
+        execution (Falco, attack and alert checking, which needs the rules loaded) and
+        recording. Mutation and rendering of the next cases overlap with the Falco run of
+        the current one, while the mutant sequence stays the same as running in series.
+        Execution spreads batches over config.lanes isolated lanes, and results are still
+        recorded in campaign order.
+
+        Args:
+            config: what to run, see CampaignConfig
+            falco_path: path to the Falco binary
+            falco_config_path: path to the Falco .yaml config
+            rule_path: path to the .yaml rules the seeds come from
+            seed_path: path to the seed corpus
+            syscalls_path: path to the syscall vocabulary
+            cache_path: directory of caches and checkpoints
+        """
+        self.config = config
+        self.falco_path = falco_path
+        self.falco_config_path = falco_config_path
+
+        self.sample_rng = random.Random(config.rng_seed)
+        syscalls = load_syscalls(syscalls_path)
+
+        self.checkpoint = Checkpoint(
+            os.path.join(cache_path, f"{config.name}-checkpoint.jsonl"),
+            {
+                "rng_seed": config.rng_seed, "rounds": config.rounds, "option_sets": len(config.option_sets),
+                "mutation_iterations": list(config.mutation_iterations), "mutation_p": config.mutation_p
+            }
+        )
+        self.logger = Logger(config.name, config.entry_type, logs_path=self.checkpoint.logs_path, on_flush=self.checkpoint.commit)
+        atexit.register(self.logger.close)
+        self.checkpoint.start(self.logger.logs_path)
+        self.parser = FalcoParser()
+        self.mutator = InsertDeadSubtrees(
+            syscalls, iterations=config.mutation_iterations, p=config.mutation_p, seed=config.rng_seed
+        )
+        self.checker = EquivalenceChecker(syscalls)
+        self.seen = SeenSet(os.path.join(self.logger.logs_path, "seen.txt"))
+        self.baselines = BaselineCache(
+            os.path.join(cache_path, "baselines.jsonl"),
+            falco_path,
+            resample=config.baseline_resample,
+            min_samples=config.baseline_min_samples,
+            seed=config.rng_seed
+        )
+        self.seeds, self.blacklist_syscalls = load_seeds_cached(rule_path, seed_path, self.parser, cache_path)
+        remove_containers()
+        self.lanes = queue.Queue()
+        for index in range(config.lanes):
+            lane = Lane(index, config.lanes, falco_path, falco_config_path)
+            atexit.register(lane.close)
+            self.lanes.put(lane)
+        self.latencies = LatencyTracker(quantile=0.99, margin=0.5, max_timeout=30)
+        self.rngs = {"sample": self.sample_rng, "mutator": self.mutator.rng, "baselines": self.baselines.rng}
+
+    def run(self) -> None:
+        stages = [self.render, self.execute]
+        batches = pipeline(self.batches(), stages, self.config.queue_size, workers=[1, self.config.lanes])
+        for batch in batches:
+            for case in batch.cases:
+                for message in case.logs:
+                    self.logger.log(message)
+            for message in batch.logs:
+                self.logger.log(message)
+            for case in batch.cases:
+                self.record(case, batch)
+
+        # Flush the last entries before marking the campaign finished
+        self.logger.mark()
+        self.logger.close()
+        self.checkpoint.finish()
+
+    def session_options(self, option_set: OptionSet) -> list[str]:
+        return option_set.options + (["-o", "rule_matching=all"] if self.config.single_session else [])
+
+    def batches(self) -> Iterator[Batch]:
+        """Group consecutive cases of an option set into batches of batch_size cases to run.
+        """
+        cases = []
+        for case in self.mutate_cases():
+            if cases and case.option_set is not cases[0].option_set:
+                yield self.plan(cases)
+                cases = []
+            cases.append(case)
+            if sum(not case.abort for case in cases) >= self.config.batch_size:
+                yield self.plan(cases)
+                cases = []
+        if cases:
+            yield self.plan(cases)
+
+    def plan(self, cases: list[Case], schedule: bool = True) -> Batch:
+        """
+        Lay out the Falco sessions of a batch: one for all rules, or one for the seeds and
+        one for the mutants. Rule names are the labels, suffixed with the round in batches
+        of several cases so every rule in a session is unique.
+
+        A seed attacked together with other seeds may alert on their events, so only
+        baselines measured in sessions attacking a single seed are cached, and scheduled
+        for the reuse decisions of later cases unless schedule is False.
+        """
+        batch = Batch(cases=cases, options=self.session_options(cases[0].option_set))
+        groups = [["r", "r'"]] if self.config.single_session else [["r"], ["r'"]]
+        for labels in groups:
+            session = Session()
+            for case in cases:
+                if case.abort: continue
+                for t, label in case.runs:
+                    if label not in labels: continue
+                    name = label if self.config.batch_size == 1 else f"{label}-{case.round}"
+                    session.members[name] = (case, label)
+                    session.trees[name] = t
+            if session.members:
+                batch.sessions.append(session)
+
+        if self.config.cache_baselines and schedule:
+            for session in batch.sessions:
+                if len(session.seed_names) > 1: continue
+                for case, label in session.members.values():
+                    if label == "r":
+                        self.baselines.schedule(case.baseline_key)
+        return batch
+
+    def mutate_cases(self) -> Iterator[Case]:
+        """
+        Mutation stage: yield cases in campaign order. The random generators are only
+        used here, so the mutant sequence does not depend on how far the other stages are.
+        """
+        config = self.config
+        for s, option_set in enumerate(config.option_sets):
+            for i in range(config.rounds):
+                # Skip cases finished before an interruption, the first unfinished one starts over
+                # from its journaled state, so the mutant sequence is the same as without interruption
+                index = (s, i)
+                if self.checkpoint.skip(index): continue
+                state = self.checkpoint.restore(index)
+                if state is not None:
+                    self.logger.log(f"Resuming at round {i+1}/{config.rounds} {option_set.name}".rstrip())
+                    for key, rng in self.rngs.items():
+                        set_rng_state(rng, state[key])
+                    self.seen.truncate(state["seen"])
+                    self.baselines.restore(state["baseline_counts"], state["baseline_samples"])
+                # The measurement counts of the baselines are those of get() decisions, taken here
+                # in campaign order, their samples are added by record()
+                state = {
+                    **{key: rng_state(rng) for key, rng in self.rngs.items()},
+                    "seen": self.seen.count,
+                    "baseline_counts": dict(self.baselines.counts)
+                }
+
+                case = Case(index=index, round=i+1, option_set=option_set, state=state)
+                yield self.mutate(case)
+
+    def mutate(self, case: Case) -> Case:
+        config = self.config
+        case.seed_name, case.tree = self.sample_rng.choice(self.seeds)
+        case.log(f"Round {case.round}/{config.rounds} {case.option_set.name}".rstrip() + f": {case.seed_name}")
+
+        # Insert dead subtrees into rule tree
+        try:
+            case.log(f"\tMutating rule")
+            with case.timer.stage("mutate"):
+                case.tree_prime = self.mutator.transform(case.tree, self.blacklist_syscalls[case.seed_name])
+        except Exception as e:
+            case.log(f"\tMutation failed: {e}")
+            case.abort = True
+            return case
+
+        # Only run mutants that are provably equivalent to the seed on every event type
+        if config.static_check and not self.checker.equivalent(case.tree, case.tree_prime):
+            case.log(f"\tMutant not provably equivalent, skipped")
+            case.abort = True
+            return case
+
+        # Skip mutants already run in an equivalent form under the same options
+        options = self.session_options(case.option_set)
+        if config.dedup and not self.seen.add(test_key(case.tree, case.tree_prime, options)):
+            case.log(f"\tDuplicate mutant, skipped")
+            case.abort = True
+            return case
+
+        # Reuse a cached outcome of the unmutated seed, except for the occasional re-measurement
+        case.runs = [(case.tree, "r"), (case.tree_prime, "r'")]
+        case.rule = self.parser.to_rule(case.tree)
+        case.baseline_key = self.baselines.key(case.rule, options, case.seed_name)
+        case.baseline_draw = self.baselines.get(case.baseline_key) if config.cache_baselines else None
+        if case.baseline_draw is not None:
+            case.runs = [(case.tree_prime, "r'")]
+        return case
+
+    def render(self, batch: Batch) -> Batch:
+        """Rendering stage: serialize the rules of each session into a temp .yaml file.
+        """
+        for session in batch.sessions:
+            session.alerts = {name: (False, -1) for name in session.members}
+            try:
+                fd, session.rule_file = tempfile.mkstemp(prefix="falco-rules-", suffix=".yaml")
+                os.close(fd)
+                batch.log(f"\tPreparing rules at {session.rule_file}")
+                os.chmod(session.rule_file, 0o777)
+                for name, t in session.trees.items():
+                    with session.timer.stage("serialize"):
+                        session.rules[name] = self.parser.to_rule(t)
+                    batch.log(f"\tLength [{name}]: ({len(session.rules[name])})")
+                with session.timer.stage("write"):
+                    write_rules(session.rule_file, session.rules, SCOPE_MACRO if self.config.lanes > 1 else None)
+            except Exception as e:
+                batch.log(f"\tPrepare rule failed: {e}")
+                session.abort = True
+        return batch
+
+    def execute(self, batch: Batch) -> Batch:
+        """Execution stage: run every session of a batch in Falco on a free lane and check its alerts.
+        """
+        lane = self.lanes.get()
+        try:
+            if self.config.lanes > 1:
+                batch.log(f"\tLane {lane.index}")
+            for session in batch.sessions:
+                try:
+                    self._execute(batch, session, lane)
+                finally:
+                    if session.rule_file:
+                        os.remove(session.rule_file)
+        finally:
+            self.lanes.put(lane)
+        return batch
+
+    def _attack(self, lane: Lane, seed_names: list[str]) -> None:
+        """Run the attacks of several seeds in one event-generator run, selecting them by regex.
+        """
+        if len(seed_names) == 1:
+            lane.generator.run(seed_names[0])
+        else:
+            lane.generator.run(f"^({"|".join(re.escape(seed_name) for seed_name in seed_names)})$")
+
+    def _execute(self, batch: Batch, session: Session, lane: Lane) -> None:
+        config = self.config
+        timer = session.timer
+        options = batch.options + lane.options
+        falco_process, falco_client = None, None
+
+        # Launch Falco with the rules
+        if not session.abort:
+            try:
+                batch.log(f"\tLaunching Falco")
+                with timer.stage("launch"):
+                    if config.persistent:
+                        lane.supervisor.load(session.rule_file, options)
+                    else:
+                        falco_process = run_falco(self.falco_path, self.falco_config_path, session.rule_file, options, lane.rule_files)
+            except Exception as e:
+                batch.log(f"\tLaunch failed: \n{e}")
+                session.abort = True
+
+        # Initialize Falco client
+        if not session.abort:
+            try:
+                falco_client = falco.Client(endpoint=lane.endpoint, output_format="json")
+                with timer.stage("ready"):
+                    ready_time = wait_ready(falco_client, falco_process, lane.socket_path)
+                batch.log(f"\tFalco ready ({ready_time:.3f})")
+            except Exception as e:
+                batch.log(f"\tClient failed: {e}")
+                session.abort = True
+
+        # Launch attack
+        if not session.abort:
+            try:
+                batch.log(f"\tLaunching attack")
+                with timer.attack():
+                    self._attack(lane, session.seed_names)
+            except Exception as e:
+                batch.log(f"\tAttack failed: \n{e}")
+                session.abort = True
+
+        # Check alerts
+        if not session.abort:
+            try:
+                batch.log(f"\tChecking alerts")
+                names = list(session.members)
+                keys = {name: case.seed_name for name, (case, _) in session.members.items()}
+                if config.adaptive_timeout:
+                    timeout = max(self.latencies.timeout(seed_name) for seed_name in session.seed_names)
+                else:
+                    timeout = self.latencies.max_timeout
+                with timer.stage("alert"):
+                    session.alerts = lane.subscriber.alerts(session.rule_file, names, timeout, self.latencies, keys)
+
+                # A miss under a shortened timeout may just be slow, confirm it with another attack
+                missed = [name for name in names if not session.alerts[name][0]]
+                if missed and timeout < self.latencies.max_timeout:
+                    batch.log(f"\tSuspected miss after {timeout:.2f}s, confirming {missed}")
+                    with timer.attack():
+                        self._attack(lane, list(dict.fromkeys(keys[name] for name in missed)))
+                    with timer.stage("alert"):
+                        session.alerts.update(lane.subscriber.alerts(session.rule_file, missed, timeout))
+
+                # Keep the first alerts before the tag is cleared, for their raw event timestamps
+                session.details = {name: lane.subscriber.first(name, session.rule_file, 0) for name in names}
+
+                for name, (alert, alert_time) in session.alerts.items():
+                    alert_status = f"\033[0;32m{True}\033[0m" if alert else f"\033[0;31m{False}\033[0m"
+                    batch.log(f"\tChecked events: [{name}] {alert_status} ({alert_time:.5f})")
+            except Exception as e:
+                batch.log(f"\tCheck failed: {e}")
+                session.abort = True
+
+        # Cleanup: delete client, stop Falco
+        teardown_start = time.perf_counter_ns()
+        try:
+            batch.log("\tCleanup")
+            lane.subscriber.clear(session.rule_file)
+
+            if falco_client:
+                del falco_client
+
+            if config.persistent:
+                session.returncode = lane.supervisor.returncode
+
+            if falco_process:
+                session.returncode = stop_falco(falco_process, lane.socket_path)
+
+        except Exception as e:
+            batch.log(f"\tCleanup failed: {e}")
+        finally:
+            timer.durations["teardown"] = time.perf_counter_ns() - teardown_start
+
+    def record(self, case: Case, batch: Batch) -> None:
+        """
+        Recording stage: write the entries and samples of a finished case.
+        Cases arrive in campaign order, so the entries before a case belong to finished
+        cases when it is journaled. Stage timings after mutation are those of the whole
+        session the case ran in.
+        """
+        self.logger.mark()
+        # The baselines measured before the case, a resume serves from these only
+        case.state["baseline_samples"] = self.baselines.lengths()
+        self.checkpoint.begin(case.index, case.state)
+        if case.abort: return
+
+        fields = case.option_set.fields
+        prefix = f"{case.option_set.name}-" if case.option_set.name else ""
+        sessions = batch.sessions
+        if case.baseline_draw is not None:
+            # Earlier cases are recorded by now, so the draw does not depend on pipeline timing
+            case.baseline = self.baselines.sample(case.baseline_key, case.baseline_draw)
+            if case.baseline is None:
+                sessions = self.remeasure(case) + sessions
+            else:
+                alert, alert_time = case.baseline
+                self.logger.log(f"\tCached baseline: [r] {alert} ({alert_time:.5f})")
+        if case.baseline is not None:
+            alert, alert_time = case.baseline
+            entry = self.config.entry_type(
+                **fields,
+                round=case.round,
+                seed=case.seed_name,
+                label="r",
+                length=len(case.rule),
+                alert=alert,
+                time=alert_time,
+                returncode=0,
+                cached=True,
+                timings=case.timer.timings()
+            )
+            self.logger.entry(entry)
+
+        for session in sessions:
+            for name, (member, label) in session.members.items():
+                if member is not case or name not in session.rules: continue
+                rule = session.rules[name]
+                alert, alert_time = session.alerts[name]
+
+                # Record rules if they are interesting
+                if session.abort or not alert:
+                    self.logger.sample(filename=f"{prefix}{case.round}-{label}.txt", sample=rule)
+
+                detail = session.details.get(name)
+                timings = session.timer.timings(detail.rawtime, detail.received_ns) if detail else session.timer.timings()
+                entry = self.config.entry_type(
+                    **fields,
+                    round=case.round,
+                    seed=case.seed_name,
+                    label=label,
+                    length=len(rule),
+                    alert=alert,
+                    time=alert_time,
+                    returncode=session.returncode,
+                    timings={**case.timer.timings(), **timings}
+                )
+                self.logger.entry(entry)
+
+                if label == "r" and not session.abort and len(session.seed_names) == 1:
+                    self.baselines.put(case.baseline_key, alert, alert_time)
+
+    def remeasure(self, case: Case) -> list[Session]:
+        """
+        Measure r of a case that was to reuse a baseline, when every measurement scheduled
+        before it failed. Runs in the recording stage, so in campaign order, without
+        scheduling it for later cases, which already counted the failed measurement.
+
+        Returns:
+            list: the sessions r ran in
+        """
+        self.logger.log(f"\tNo cached baseline after failed measurements, measuring [r]")
+        case.runs = [(case.tree, "r")]
+        batch = self.execute(self.render(self.plan([case], schedule=False)))
+        for message in batch.logs:
+            self.logger.log(message)
+        return batch.sessions
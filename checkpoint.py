@@ -0,0 +1,122 @@
+import os
+import json
+import random
+
+
+def read_jsonl(path: str) -> tuple[list[dict], bool]:
+    """
+    Read the records of a JSON lines file, skipping a torn last line from an interrupted write.
+
+    Returns:
+        tuple: the records, and whether the file ends in a torn line, which must be
+            terminated before appending to the file
+    """
+    records = []
+    torn = False
+    if os.path.exists(path):
+        with open(path) as f:
+            line = "\n"
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+            torn = not line.endswith("\n")
+    return records, torn
+
+
+def rng_state(rng: random.Random) -> list:
+    version, internal, gauss = rng.getstate()
+    return [version, list(internal), gauss]
+
+
+def set_rng_state(rng: random.Random, state: list) -> None:
+    version, internal, gauss = state
+    rng.setstate((version, tuple(internal), gauss))
+
+
+class Checkpoint:
+    def __init__(self, path: str, config: dict) -> None:
+        """
+        Journal of campaign progress, so an interrupted campaign resumes where it stopped.
+        Before each case, the campaign passes its case index and state (RNG states and
+        the like) to begin(). The pending record is appended to a JSON lines journal on
+        commit(), which the Logger calls whenever it has flushed the entries of every case
+        before it, so the journal never gets ahead of the results on disk.
+
+        A journal is resumed if it was written with the same config and the campaign
+        has not finished, otherwise a new campaign starts over it.
+
+        Args:
+            path: path to the .jsonl journal
+            config: campaign parameters that must match for a resume (seeds, rounds, ...)
+        """
+        self.path = path
+        self.config = config
+        self.resumed = False
+        self.logs_path: str = None
+        self.case: list = None
+        self.state: dict = None
+        self.pending: dict = None
+        self.journaled = False
+
+        records, torn = read_jsonl(path)
+        if (
+            records and records[0].get("config") == config and "done" not in records[-1]
+            and os.path.isdir(records[0]["logs_path"])
+        ):
+            self.resumed = True
+            self.logs_path = records[0]["logs_path"]
+            if len(records) > 1:
+                self.case, self.state = records[-1]["case"], records[-1]["state"]
+                self.journaled = True
+            self.file = open(path, "a")
+            if torn:
+                self.file.write("\n")
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.file = open(path, "w")
+
+    def start(self, logs_path: str) -> None:
+        """Record the logs directory of a new campaign, which a resume reopens.
+        """
+        if self.resumed: return
+        self.logs_path = logs_path
+        self._append({"config": self.config, "logs_path": logs_path})
+
+    def skip(self, case: tuple) -> bool:
+        """Whether a case was finished before the campaign was interrupted.
+        """
+        return self.case is not None and list(case) < self.case
+
+    def restore(self, case: tuple) -> dict | None:
+        """
+        Returns:
+            dict: the state journaled before case, for the first case to run on resume,
+                or None otherwise
+        """
+        if self.case is None or list(case) != self.case:
+            return None
+        state, self.case, self.state = self.state, None, None
+        return state
+
+    def begin(self, case: tuple, state: dict) -> None:
+        self.pending = {"case": list(case), "state": state}
+        # Journal the first case at once, a resume always needs a state to start from
+        if not self.journaled:
+            self.commit()
+
+    def commit(self) -> None:
+        if self.pending is not None:
+            self._append(self.pending)
+            self.pending = None
+            self.journaled = True
+
+    def finish(self) -> None:
+        self._append({"done": True})
+        self.file.close()
+
+    def _append(self, record: dict) -> None:
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
@@ -0,0 +1,148 @@
+import os
+import hashlib
+
+from lark import Tree
+
+from falco_ast import Node, Rule, And, Or, Not, Group, Pred, Macro, Set, from_lark
+
+
+def _digest(*parts: bytes) -> bytes:
+    return hashlib.blake2b(b"\0".join(parts), digest_size=16).digest()
+
+
+def canonicalize(tree: Node | Tree) -> tuple[Node, bytes]:
+    """
+    Rewrite a condition into a canonical form and compute its structural hash.
+    And/or chains are flattened and their operands sorted by hash, set elements are
+    sorted and deduplicated, and groups are kept only where precedence needs them.
+    Conditions that only differ by commutativity, set order or redundant nesting get
+    the same canonical form and the same hash.
+
+    Returns:
+        tuple: canonical condition and its 16 byte structural hash
+    """
+    if isinstance(tree, Tree):
+        tree = from_lark(tree)
+
+    node, digest = _canonicalize(tree)
+    return Rule(node), digest
+
+
+def structural_hash(tree: Node | Tree) -> bytes:
+    return canonicalize(tree)[1]
+
+
+def _canonicalize(node: Node) -> tuple[Node, bytes]:
+    if isinstance(node, (Rule, Group)):
+        return _canonicalize(node.children[0])
+
+    if isinstance(node, (And, Or)):
+        kind = type(node)
+        operands = sorted((_canonicalize(operand) for operand in _flatten(node, kind)), key=lambda item: item[1])
+        digest = _digest(kind.__name__.encode(), *(operand_digest for _, operand_digest in operands))
+
+        # Rebuild a left-associative chain, grouping operands of the other operator and
+        # negations, which the Earley parser would otherwise extend over the whole chain
+        chain = None
+        for operand, _ in operands:
+            operand = Group(operand) if isinstance(operand, (And, Or, Not)) else operand
+            chain = operand if chain is None else kind(chain, operand)
+        return chain, digest
+
+    if isinstance(node, Not):
+        child, child_digest = _canonicalize(node.children[0])
+        child = Group(child) if isinstance(child, (And, Or)) else child
+        return Not(child), _digest(b"Not", child_digest)
+
+    if isinstance(node, Macro):
+        return node, _digest(b"Macro", node.name.encode())
+
+    if isinstance(node, Pred):
+        value = node.value
+        if isinstance(value, Set):
+            elements = {element.value: element for element in value.elements}
+            keys = sorted(elements, key=str)
+            value = Set([elements[key] for key in keys])
+            value_key = b"(" + "\0".join(map(str, keys)).encode()
+        else:
+            value_key = b"" if value is None else str(value.value).encode()
+        node = Pred(node.field, node.op, value)
+        return node, _digest(b"Pred", node.field.encode(), node.op.value.encode(), value_key)
+
+    raise ValueError(f"Unknown node {type(node).__name__}")
+
+
+def _flatten(node: Node, kind: type) -> list[Node]:
+    """Collect the operands of a chain of kind, looking through groups.
+    """
+    operands = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        while isinstance(node, Group):
+            node = node.children[0]
+        if isinstance(node, kind):
+            stack.extend(reversed(node.children))
+        else:
+            operands.append(node)
+    return operands
+
+
+def test_key(tree: Node | Tree, tree_prime: Node | Tree, options: list[str] = []) -> bytes:
+    """Identify a test case: the canonical seed and mutant, run with the given Falco options.
+    """
+    return _digest(structural_hash(tree), structural_hash(tree_prime), "\0".join(options).encode())
+
+
+class SeenSet:
+    def __init__(self, path: str) -> None:
+        """
+        Persistent set of test keys, backed by an append-only file of hex digests.
+        Every key is flushed as it is added, so keys survive a crash and a later run
+        resumes with everything executed so far.
+
+        Args:
+            path: path to the file holding the keys
+        """
+        self.path = path
+        self.keys = set()
+        self.count = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if os.path.exists(path):
+            with open(path) as f:
+                keys = f.read().split()
+            self.keys, self.count = set(keys), len(keys)
+        self.file = open(path, "a")
+
+    def __contains__(self, key: bytes) -> bool:
+        return key.hex() in self.keys
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: bytes) -> bool:
+        """Add a key. Returns False if it was already present.
+        """
+        key = key.hex()
+        if key in self.keys: return False
+        self.keys.add(key)
+        self.count += 1
+        self.file.write(f"{key}\n")
+        self.file.flush()
+        return True
+
+    def truncate(self, count: int) -> None:
+        """Forget every key after the first count, e.g. those of a case that is run again on resume.
+        """
+        self.file.close()
+        with open(self.path) as f:
+            keys = f.read().split()[:count]
+        with open(self.path, "w") as f:
+            f.writelines(f"{key}\n" for key in keys)
+        self.keys, self.count = set(keys), len(keys)
+        self.file = open(self.path, "a")
+
+    def close(self) -> None:
+        self.file.close()
+
@@ -0,0 +1,168 @@
+from lark import Tree
+
+from falco_ast import Node, Rule, And, Or, Not, Group, Pred, Macro, Set, Value, from_lark
+
+
+class EquivalenceChecker:
+    def __init__(self, syscalls: set[str]) -> None:
+        """
+        Statically check that a mutant is equivalent to its seed over the evt.type domain.
+
+        Every node is abstracted to two bitsets over the syscall vocabulary: may (the node
+        can be true for that event type) and must (it is true whatever the other fields are).
+        One extra bit stands for all event types outside the vocabulary, so conditions on
+        e.g. evt.type = container are never mistaken for dead ones. Both conditions are then
+        simplified under these bounds, folding away every subtree whose value is fixed
+        wherever it matters, and compared structurally. Equal residuals prove equivalence,
+        different ones mean the mutant is not provably equivalent.
+
+        Args:
+            syscalls: vocabulary of all syscalls
+        """
+        self.bits = {syscall: 1 << i for i, syscall in enumerate(sorted(syscalls))}
+        self.other = 1 << len(self.bits)
+        self.all = (self.other << 1) - 1
+        self.value_bits: dict[Value, int] = {}
+
+    def equivalent(self, tree: Node | Tree, tree_prime: Node | Tree) -> bool:
+        """
+        Args:
+            tree: the seed condition
+            tree_prime: the mutated condition
+
+        Returns:
+            bool: True if both conditions match the same events for every event type
+        """
+        # Both conditions share the seed's predicates, so they share their bounds too
+        bounds = {}
+        return self.residual(tree, bounds) == self.residual(tree_prime, bounds)
+
+    def residual(self, tree: Node | Tree, bounds: dict = None):
+        """Simplify a condition to a fixpoint, as a nested tuple without groups.
+        """
+        if isinstance(tree, Tree):
+            tree = from_lark(tree)
+        if bounds is None:
+            bounds = {}
+
+        key = self._key(tree)
+        while True:
+            simplified, _, _ = self._simplify(key, self.all, bounds)
+            if simplified == key: return key
+            key = simplified
+
+    def _key(self, node: Node):
+        if isinstance(node, (Rule, Group)):
+            return self._key(node.children[0])
+        if isinstance(node, And):
+            return ("and", self._key(node.children[0]), self._key(node.children[1]))
+        if isinstance(node, Or):
+            return ("or", self._key(node.children[0]), self._key(node.children[1]))
+        if isinstance(node, Not):
+            return ("not", self._key(node.children[0]))
+        if isinstance(node, Macro):
+            return ("macro", node.name)
+        return ("pred", node)
+
+    def _bounds(self, key, bounds: dict) -> tuple[int, int]:
+        """Return (may, must) bitsets of a key, memoized by identity.
+        """
+        if key is True: return self.all, self.all
+        if key is False: return 0, 0
+
+        cached = bounds.get(id(key))
+        if cached is not None: return cached[1]
+
+        kind = key[0]
+        if kind == "and":
+            may_a, must_a = self._bounds(key[1], bounds)
+            may_b, must_b = self._bounds(key[2], bounds)
+            result = may_a & may_b, must_a & must_b
+        elif kind == "or":
+            may_a, must_a = self._bounds(key[1], bounds)
+            may_b, must_b = self._bounds(key[2], bounds)
+            result = may_a | may_b, must_a | must_b
+        elif kind == "not":
+            may, must = self._bounds(key[1], bounds)
+            result = self.all & ~must, self.all & ~may
+        elif kind == "pred":
+            cached = bounds.get(id(key[1]))
+            result = cached[1] if cached is not None else self._pred_bounds(key[1])
+            bounds[id(key[1])] = (key[1], result)
+        else:
+            result = self.all, 0
+
+        bounds[id(key)] = (key, result)
+        return result
+
+    def _pred_bounds(self, pred: Pred) -> tuple[int, int]:
+        op = pred.op.type
+
+        if pred.field == "evt.type" and op in ("EQ", "NEQ", "IN"):
+            values = pred.value.elements if isinstance(pred.value, Set) else [pred.value]
+            may = 0
+            cached_bit = self.value_bits.get
+            for value in values:
+                may |= cached_bit(value) or self._value_bit(value)
+            # Names outside the vocabulary only ever may match, the extra bit covers many types
+            must = may & ~self.other
+            if op == "NEQ":
+                return self.all & ~must, self.all & ~may
+            return may, must
+
+        # evt.type.is.<syscall> = 1 (or 0) is true exactly for that event type (or all others)
+        if pred.field.startswith("evt.type.is.") and op == "EQ" and pred.value is not None:
+            bit = self.bits.get(pred.field[len("evt.type.is."):])
+            if bit is not None and str(pred.value.value) in ("0", "1"):
+                if str(pred.value.value) == "1": return bit, bit
+                return self.all & ~bit, self.all & ~bit
+
+        return self.all, 0
+
+    def _value_bit(self, value: Value) -> int:
+        """Bit of an evt.type value. Values are interned, so they are looked up by identity.
+        """
+        bit = self.value_bits.get(value)
+        if bit is None:
+            bit = self.bits.get(str(value.value).strip("'\""), self.other)
+            self.value_bits[value] = bit
+        return bit
+
+    def _simplify(self, key, care: int, bounds: dict):
+        """
+        Simplify a key for the event types in care, the ones where its value can still
+        change the result. Siblings are simplified one after another, each under the
+        bounds of the other, so the result is equivalent to the key on care.
+
+        Returns:
+            tuple: simplified key and its (may, must) bitsets
+        """
+        may, must = self._bounds(key, bounds)
+        if may & care == 0: return False, 0, 0
+        if must & care == care: return True, self.all, self.all
+
+        kind = key[0]
+        if kind == "and":
+            may_b, _ = self._bounds(key[2], bounds)
+            a, may_a, must_a = self._simplify(key[1], care & may_b, bounds)
+            b, may_b, must_b = self._simplify(key[2], care & may_a, bounds)
+            if a is False or b is False: return False, 0, 0
+            if a is True: return b, may_b, must_b
+            if b is True: return a, may_a, must_a
+            return ("and", a, b), may_a & may_b, must_a & must_b
+
+        if kind == "or":
+            _, must_b = self._bounds(key[2], bounds)
+            a, may_a, must_a = self._simplify(key[1], care & ~must_b, bounds)
+            b, may_b, must_b = self._simplify(key[2], care & ~must_a, bounds)
+            if a is True or b is True: return True, self.all, self.all
+            if a is False: return b, may_b, must_b
+            if b is False: return a, may_a, must_a
+            return ("or", a, b), may_a | may_b, must_a | must_b
+
+        if kind == "not":
+            a, may_a, must_a = self._simplify(key[1], care, bounds)
+            if isinstance(a, bool): return not a, (0 if a else self.all), (0 if a else self.all)
+            return ("not", a), self.all & ~must_a, self.all & ~may_a
+
+        return key, may, must
@@ -0,0 +1,481 @@
+import re
+import json
+import fnmatch
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from lark import Tree
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:
+    np = pd = None
+
+from falco_ast import Node, Rule, And, Or, Not, Group, Macro, Pred, Set, Value, from_lark
+
+Event = dict[str, Any]
+Condition = Callable[[Event], bool]
+
+
+def literal(value: Value) -> str:
+    """Text of a value token, without its quotes.
+    """
+    if value.type == "SINGLE_QUOTED_STRING":
+        return value.value[1:-1]
+    if value.type == "DOUBLE_QUOTED_STRING":
+        return re.sub(r"\\(.)", r"\1", value.value[1:-1])
+    return str(value.value)
+
+
+def number(value: Any) -> int | float | None:
+    """Numeric value of a field value or literal, or None if it is not a number.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return int(value, 0)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def text(value: Any) -> str:
+    """Field value as Falco compares it against string literals.
+    """
+    if type(value) is str:
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+class ConditionCompiler:
+    def __init__(self, macros: dict[str, Node | Tree] = None) -> None:
+        """
+        Compile condition trees into Python closures over event dicts, to evaluate rules
+        without Falco. Events map field names as they appear in conditions ("evt.type",
+        "proc.aname[2]", ...) to values, like the output fields of Falco alerts. A field that
+        is missing or None fails every predicate on it, as in Falco.
+
+        Literals, sets, globs and regexes are prepared once per predicate, and compiled
+        predicates are shared by every tree they appear in, so a mutant only compiles the
+        predicates it adds to its seed.
+
+        Args:
+            macros: conditions of macros left unexpanded in the trees
+        """
+        self.macros = macros or {}
+        self.preds: dict[tuple, Condition] = {}
+
+    def compile(self, tree: Node | Tree) -> Condition:
+        if isinstance(tree, Tree):
+            tree = from_lark(tree)
+        return self._compile(tree)
+
+    def _compile(self, node: Node) -> Condition:
+        if isinstance(node, (Rule, Group)):
+            return self._compile(node.children[0])
+
+        if isinstance(node, Not):
+            child = self._compile(node.children[0])
+            return lambda event: not child(event)
+
+        if isinstance(node, (And, Or)):
+            operands = tuple(self._compile(operand) for operand in _flatten(node, type(node)))
+            if isinstance(node, And):
+                if len(operands) == 2:
+                    left, right = operands
+                    return lambda event: left(event) and right(event)
+
+                def conjunction(event: Event) -> bool:
+                    for operand in operands:
+                        if not operand(event): return False
+                    return True
+                return conjunction
+
+            if len(operands) == 2:
+                left, right = operands
+                return lambda event: left(event) or right(event)
+
+            def disjunction(event: Event) -> bool:
+                for operand in operands:
+                    if operand(event): return True
+                return False
+            return disjunction
+
+        if isinstance(node, Macro):
+            if node.name not in self.macros:
+                raise ValueError(f"Unknown macro {node.name}")
+            return self.compile(self.macros[node.name])
+
+        if isinstance(node, Pred):
+            value = tuple(node.value.elements) if isinstance(node.value, Set) else node.value
+            key = (node.field, node.op.value, value)
+            pred = self.preds.get(key)
+            if pred is None:
+                pred = self.preds[key] = _compile_pred(node)
+            return pred
+
+        raise ValueError(f"Unknown node {type(node).__name__}")
+
+    def screen(self, tree: Node | Tree, tree_prime: Node | Tree, events: Iterable[Event]) -> list[int]:
+        """
+        Returns:
+            list: indices of the events on which the two conditions disagree
+        """
+        condition, condition_prime = self.compile(tree), self.compile(tree_prime)
+        return [i for i, event in enumerate(events) if condition(event) != condition_prime(event)]
+
+
+def _flatten(node: Node, kind: type) -> list[Node]:
+    """Operands of a chain of kind, looking through groups, so long chains do not nest closures.
+    """
+    operands = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        while isinstance(node, Group):
+            node = node.children[0]
+        if isinstance(node, kind):
+            stack.extend(reversed(node.children))
+        else:
+            operands.append(node)
+    return operands
+
+
+def _compile_pred(pred: Pred) -> Condition:
+    field, op = pred.field, pred.op.value
+
+    if op == "exists":
+        return lambda event: event.get(field) is not None
+
+    if isinstance(pred.value, Set):
+        match = _set_matcher(op, pred.value.elements)
+    else:
+        match = _matcher(op, pred.value)
+
+    def evaluate(event: Event) -> bool:
+        value = event.get(field)
+        if value is None: return False
+        if type(value) is list:
+            return any(match(element) for element in value)
+        return match(value)
+
+    # Intersects compares a list field as a whole
+    if op == "intersects":
+        def evaluate(event: Event) -> bool:
+            value = event.get(field)
+            if value is None: return False
+            return match(value if type(value) is list else [value])
+
+    return evaluate
+
+
+def _matcher(op: str, token: Value) -> Callable[[Any], bool]:
+    """Comparison of one field value against a literal.
+    """
+    value = literal(token)
+    numeric = number(value) if token.type == "NUMBER" else None
+
+    if op in ("=", "!="):
+        if numeric is None:
+            equal = lambda v: text(v) == value
+        else:
+            equal = lambda v: v == numeric if type(v) in (int, float) else text(v) == value
+        return equal if op == "=" else lambda v: not equal(v)
+
+    if op in ("<", "<=", ">", ">="):
+        if numeric is None:
+            return lambda v: False
+        compare = {
+            "<": lambda n: n < numeric,
+            "<=": lambda n: n <= numeric,
+            ">": lambda n: n > numeric,
+            ">=": lambda n: n >= numeric
+        }[op]
+
+        def ordered(v) -> bool:
+            n = number(v)
+            return n is not None and compare(n)
+        return ordered
+
+    if op == "contains":
+        return lambda v: value in text(v)
+    if op == "icontains":
+        lowered = value.lower()
+        return lambda v: lowered in text(v).lower()
+    if op == "startswith":
+        return lambda v: text(v).startswith(value)
+    if op == "endswith":
+        return lambda v: text(v).endswith(value)
+    if op == "glob":
+        pattern = re.compile(fnmatch.translate(value), re.DOTALL)
+        return lambda v: pattern.match(text(v)) is not None
+    if op == "regex":
+        pattern = re.compile(value)
+        return lambda v: pattern.fullmatch(text(v)) is not None
+
+    raise ValueError(f"Unknown operator {op}")
+
+
+def _set_matcher(op: str, elements: list[Value]) -> Callable[[Any], bool]:
+    """Comparison of a field value (or the list of them for intersects) against a set.
+    """
+    values = [literal(element) for element in elements]
+    strings = frozenset(values)
+    # Only number tokens compare numerically, sparing a parse of every syscall name
+    numbers = frozenset(number(element.value) for element in elements if element.type == "NUMBER")
+
+    def member(v) -> bool:
+        if type(v) in (int, float) and v in numbers: return True
+        return text(v) in strings
+
+    if op == "in":
+        return member
+    if op == "intersects":
+        return lambda values: any(member(v) for v in values)
+    if op == "pmatch":
+        # A path matches a prefix equal to it or to one of its parent directories
+        prefixes = tuple(value.rstrip("/") + "/" for value in values)
+        return lambda v: text(v) in strings or text(v).startswith(prefixes)
+
+    raise ValueError(f"Unknown operator {op}")
+
+
+def load_events(path: str) -> 'pd.DataFrame':
+    """
+    Load captured events into a table with a column per field. The file holds JSON lines
+    or a JSON array of either Falco alerts (json_output), whose output_fields are the
+    event, or flat event dicts such as traces recorded with field names as keys.
+    """
+    if pd is None:
+        raise ImportError("Event tables require numpy and pandas")
+    with open(path) as f:
+        content = f.read()
+    if content.lstrip().startswith("["):
+        records = json.loads(content)
+    else:
+        records = [json.loads(line) for line in content.splitlines() if line.strip()]
+    events = [record.get("output_fields", record) for record in records]
+    # Object columns keep ints, strings and bools as they were, like the event dicts
+    return pd.DataFrame(events, dtype=object)
+
+
+class TableEvaluator:
+    def __init__(self, events: 'pd.DataFrame | list[Event]', macros: dict[str, Node | Tree] = None, cache_size: int = 256) -> None:
+        """
+        Evaluate condition trees over a whole table of events at once, with the semantics
+        of ConditionCompiler. Each field column is factorized once into codes and unique
+        values. A predicate is evaluated over the unique values with vectorized isin and
+        string operations, and gathered back to the events by code, then and/or/not combine
+        the masks of the predicates with &, | and ~. Fields with list values fall back to
+        the compiled predicate, still once per unique value.
+
+        Masks are cached by predicate, so a mutant only evaluates the predicates it adds to
+        its seed.
+
+        Args:
+            events: table with a column per field (see load_events), or event dicts
+            macros: conditions of macros left unexpanded in the trees
+            cache_size: number of predicate masks to keep
+        """
+        if pd is None:
+            raise ImportError("Vectorized evaluation requires numpy and pandas")
+        if not isinstance(events, pd.DataFrame):
+            events = pd.DataFrame(events, dtype=object)
+        self.events = events
+        self.size = len(events)
+        self.macros = macros or {}
+        self.cache_size = cache_size
+        self.masks: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self.columns: dict[str, _Column] = {}
+
+    def evaluate(self, tree: Node | Tree) -> 'np.ndarray':
+        """
+        Returns:
+            np.ndarray: boolean mask of the events matching the condition
+        """
+        if isinstance(tree, Tree):
+            tree = from_lark(tree)
+        return self._evaluate(tree)
+
+    def screen(self, tree: Node | Tree, tree_prime: Node | Tree) -> 'np.ndarray':
+        """
+        Returns:
+            np.ndarray: indices of the events on which the two conditions disagree
+        """
+        return np.flatnonzero(self.evaluate(tree) != self.evaluate(tree_prime))
+
+    def _evaluate(self, node: Node) -> 'np.ndarray':
+        if isinstance(node, (Rule, Group)):
+            return self._evaluate(node.children[0])
+
+        if isinstance(node, Not):
+            return ~self._evaluate(node.children[0])
+
+        if isinstance(node, (And, Or)):
+            operands = _flatten(node, type(node))
+            # Cached masks are shared, so combine into a new array
+            mask = self._evaluate(operands[0]).copy()
+            for operand in operands[1:]:
+                if isinstance(node, And):
+                    mask &= self._evaluate(operand)
+                else:
+                    mask |= self._evaluate(operand)
+            return mask
+
+        if isinstance(node, Macro):
+            if node.name not in self.macros:
+                raise ValueError(f"Unknown macro {node.name}")
+            return self.evaluate(self.macros[node.name])
+
+        if isinstance(node, Pred):
+            value = tuple(node.value.elements) if isinstance(node.value, Set) else node.value
+            key = (node.field, node.op.value, value)
+            mask = self.masks.get(key)
+            if mask is None:
+                mask = self.masks[key] = self._pred_mask(node)
+                if len(self.masks) > self.cache_size:
+                    self.masks.popitem(last=False)
+            else:
+                self.masks.move_to_end(key)
+            return mask
+
+        raise ValueError(f"Unknown node {type(node).__name__}")
+
+    def _column(self, field: str) -> '_Column | None':
+        """
+        Returns:
+            _Column: the factorized column of a field, or None if no event has the field
+        """
+        if field not in self.events.columns:
+            return None
+        if field not in self.columns:
+            column = self.events[field]
+            try:
+                codes, uniques = pd.factorize(column)
+                listed = False
+            except TypeError:
+                # Lists are unhashable, factorize them as tuples
+                codes, uniques = pd.factorize(column.map(lambda v: tuple(v) if type(v) is list else v))
+                listed = True
+            self.columns[field] = _Column(codes, np.asarray(uniques, dtype=object), listed)
+        return self.columns[field]
+
+    def _pred_mask(self, pred: Pred) -> 'np.ndarray':
+        column = self._column(pred.field)
+        if column is None:
+            return np.zeros(self.size, dtype=bool)
+
+        if column.listed:
+            evaluate = _compile_pred(pred)
+            matches = np.fromiter(
+                (evaluate({pred.field: list(v) if type(v) is tuple else v}) for v in column.uniques),
+                dtype=bool, count=len(column.uniques)
+            )
+        else:
+            matches = _match_uniques(pred, column)
+
+        # Code -1 (missing) picks the appended False
+        return np.append(matches, False)[column.codes]
+
+
+@dataclass
+class _Column:
+    """
+    A field column factorized into codes (-1 for missing values) and unique values,
+    which are tuples for list values if listed. Texts, numeric values and parsed numbers
+    of the unique values are derived on first use.
+    """
+    codes: 'np.ndarray'
+    uniques: 'np.ndarray'
+    listed: bool
+    _texts: 'pd.Series' = None
+    _numeric: 'np.ndarray' = None
+    _parsed: 'np.ndarray' = None
+
+    @property
+    def texts(self) -> 'pd.Series':
+        if self._texts is None:
+            self._texts = pd.Series([text(v) for v in self.uniques], dtype=object)
+        return self._texts
+
+    @property
+    def numeric(self) -> 'np.ndarray':
+        """Whether each unique value is a number, which compares numerically to number literals.
+        """
+        if self._numeric is None:
+            self._numeric = np.fromiter(
+                (type(v) in (int, float) for v in self.uniques), dtype=bool, count=len(self.uniques)
+            )
+        return self._numeric
+
+    @property
+    def parsed(self) -> 'np.ndarray':
+        """Unique values parsed as numbers for ordered comparisons, NaN if they are not numbers.
+        """
+        if self._parsed is None:
+            self._parsed = np.array([number(v) for v in self.uniques], dtype=float)
+        return self._parsed
+
+
+def _match_uniques(pred: Pred, column: _Column) -> 'np.ndarray':
+    """Vectorized predicate over the unique values of a field without list values.
+    """
+    op = pred.op.value
+    if op == "exists":
+        return np.ones(len(column.uniques), dtype=bool)
+
+    texts, numeric = column.texts, column.numeric
+
+    if isinstance(pred.value, Set):
+        elements = pred.value.elements
+        strings = [literal(element) for element in elements]
+        numbers = [number(element.value) for element in elements if element.type == "NUMBER"]
+        member = texts.isin(strings).to_numpy(bool)
+        if numbers:
+            member = member | (numeric & np.isin(column.parsed, numbers))
+
+        if op in ("in", "intersects"):
+            return member
+        if op == "pmatch":
+            prefixes = tuple(value.rstrip("/") + "/" for value in strings)
+            return member | texts.str.startswith(prefixes).to_numpy(bool)
+        raise ValueError(f"Unknown operator {op}")
+
+    value = literal(pred.value)
+    target = number(value) if pred.value.type == "NUMBER" else None
+
+    if op in ("=", "!="):
+        equal = texts.eq(value).to_numpy(bool)
+        if target is not None:
+            equal = np.where(numeric, column.parsed == target, equal)
+        return equal if op == "=" else ~equal
+
+    if op in ("<", "<=", ">", ">="):
+        if target is None:
+            return np.zeros(len(column.uniques), dtype=bool)
+        compare = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal}[op]
+        return compare(column.parsed, target)
+
+    if op == "contains":
+        return texts.str.contains(value, regex=False).to_numpy(bool)
+    if op == "icontains":
+        return texts.str.lower().str.contains(value.lower(), regex=False).to_numpy(bool)
+    if op == "startswith":
+        return texts.str.startswith(value).to_numpy(bool)
+    if op == "endswith":
+        return texts.str.endswith(value).to_numpy(bool)
+    if op == "glob":
+        return texts.str.match(fnmatch.translate(value)).to_numpy(bool)
+    if op == "regex":
+        return texts.str.fullmatch(value).to_numpy(bool)
+
+    raise ValueError(f"Unknown operator {op}")
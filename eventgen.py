@@ -0,0 +1,80 @@
+import docker
+from docker.errors import APIError, NotFound
+from docker.models.containers import Container
+
+from utils import ATTACK_LABEL, docker_client, remove_containers
+
+
+class EventGenerator:
+    def __init__(
+        self,
+        image: str = "falcosecurity/event-generator",
+        name: str = "falco-eventgen",
+        client: docker.DockerClient = None
+    ) -> None:
+        """
+        Keeps one privileged event-generator container warm and runs attacks in it with exec,
+        instead of creating and destroying a container per attack. The container idles in a
+        shell until an attack is exec'd into it, and is recreated if it stopped or was removed.
+        It is not auto-removed, so a stopped container stays visible to run() until close().
+
+        Args:
+            image: event-generator image
+            name: name of the container, unique per concurrent generator
+            client: Docker client, the shared one by default
+        """
+        self.image = image
+        self.name = name
+        self.client = client or docker_client()
+        self.container: Container = None
+
+    def start(self) -> None:
+        """Start the container, replacing a leftover one with the same name.
+        """
+        try:
+            self.client.containers.get(self.name).remove(force=True)
+        except NotFound:
+            pass
+
+        self.container = self.client.containers.run(
+            image=self.image,
+            entrypoint=["/bin/sh", "-c", "trap 'exit 0' TERM; while true; do sleep 3600 & wait $!; done"],
+            name=self.name,
+            labels={ATTACK_LABEL: self.name},
+            detach=True,
+            privileged=True,
+            userns_mode="host"
+        )
+
+    def run(self, action: str) -> str:
+        """
+        Run event-generator actions (an action name or a regex over them) in the container.
+
+        Returns:
+            str: event-generator output
+        """
+        if self.container is None:
+            self.start()
+        else:
+            try:
+                self.container.reload()
+                running = self.container.status == "running"
+            except NotFound:
+                running = False
+            if not running:
+                self.start()
+
+        exit_code, output = self.container.exec_run(["/bin/event-generator", "run", action], privileged=True)
+        output = output.decode("utf-8", errors="replace")
+        if exit_code != 0 or "action executed" not in output:
+            raise ChildProcessError(output)
+        return output
+
+    def close(self) -> None:
+        if self.container is not None:
+            try:
+                self.container.remove(force=True)
+            except APIError:
+                pass
+            self.container = None
+        remove_containers(self.client)
@@ -0,0 +1,83 @@
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from utils import write_rules, replay_falco
+
+
+@dataclass
+class ReplayJob:
+    round: int
+    seed: str
+    rules: dict[str, str]
+    trace_file: str
+    options: list[str] = field(default_factory=list)
+
+
+@dataclass
+class ReplayResult:
+    job: ReplayJob
+    alerts: dict[str, tuple[bool, float]]
+    returncode: int
+    error: str = None
+
+
+def run_replay_job(falco_path: str, falco_config_path: str, job: ReplayJob) -> ReplayResult:
+    """
+    Replay one test case in a private temp dir, so concurrent jobs never share
+    rule files or Falco outputs.
+    """
+    alerts = {rule_name: (False, -1) for rule_name in job.rules}
+
+    with tempfile.TemporaryDirectory(prefix="falco-replay-") as tmp_dir:
+        os.chmod(tmp_dir, 0o777)
+        rule_file = os.path.join(tmp_dir, "rules.yaml")
+        options = job.options + ["-o", f"file_output.filename={os.path.join(tmp_dir, 'events.txt')}"]
+
+        try:
+            write_rules(rule_file, job.rules)
+            alerts, returncode = replay_falco(falco_path, falco_config_path, rule_file, job.trace_file, list(job.rules), options)
+        except Exception as e:
+            return ReplayResult(job=job, alerts=alerts, returncode=-1, error=str(e))
+
+    return ReplayResult(job=job, alerts=alerts, returncode=returncode)
+
+
+class ReplayExecutor:
+    def __init__(self, falco_path: str, falco_config_path: str, workers: int = None) -> None:
+        """
+        Fan replay jobs out over a pool of worker processes.
+
+        Args:
+            falco_path: path to the Falco binary
+            falco_config_path: path to the Falco .yaml config
+            workers: number of worker processes, defaults to the number of cores
+        """
+        self.falco_path = falco_path
+        self.falco_config_path = falco_config_path
+        self.workers = workers or os.cpu_count()
+
+    def run(self, jobs: Iterable[ReplayJob]) -> Iterator[ReplayResult]:
+        """
+        Run jobs and yield results as they finish, in completion order.
+        Jobs are drawn lazily and at most 2 * workers are in flight, so a long
+        generator of jobs is never materialized at once.
+        """
+        jobs = iter(jobs)
+        max_pending = 2 * self.workers
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = set()
+
+            while True:
+                for job in jobs:
+                    pending.add(pool.submit(run_replay_job, self.falco_path, self.falco_config_path, job))
+                    if len(pending) >= max_pending: break
+
+                if not pending: break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
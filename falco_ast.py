@@ -0,0 +1,222 @@
+from lark import Tree, Token
+
+
+class Value:
+    """
+    A token (type and text), interned: every distinct (type, value) pair has a single
+    instance, so the thousands of syscall names in mutated sets are shared pointers.
+    Never modify a Value in place.
+    """
+    __slots__ = ("type", "value")
+    _interned: dict[tuple[str, str], 'Value'] = {}
+
+    def __new__(cls, type: str, value: str) -> 'Value':
+        key = (type, value)
+        instance = cls._interned.get(key)
+        if instance is None:
+            instance = super().__new__(cls)
+            instance.type = type
+            instance.value = value
+            cls._interned[key] = instance
+        return instance
+
+    def __reduce__(self):
+        # Unpickled values are interned again
+        return (Value, (self.type, self.value))
+
+    def __repr__(self) -> str:
+        return f"Value({self.type!r}, {self.value!r})"
+
+
+class Node:
+    """Base of condition nodes. Structural nodes keep their operands in a children list.
+    """
+    __slots__ = ()
+    children = ()
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    # Equality is structural and children lists are edited in place, so nodes are unhashable
+    __hash__ = None
+
+
+class Rule(Node):
+    __slots__ = ("children",)
+
+    def __init__(self, child: Node) -> None:
+        self.children = [child]
+
+    def write(self, parts: list[str]) -> None:
+        self.children[0].write(parts)
+
+
+class And(Node):
+    __slots__ = ("children",)
+
+    def __init__(self, left: Node, right: Node) -> None:
+        self.children = [left, right]
+
+    def write(self, parts: list[str]) -> None:
+        self.children[0].write(parts)
+        parts.append(" and ")
+        self.children[1].write(parts)
+
+
+class Or(Node):
+    __slots__ = ("children",)
+
+    def __init__(self, left: Node, right: Node) -> None:
+        self.children = [left, right]
+
+    def write(self, parts: list[str]) -> None:
+        self.children[0].write(parts)
+        parts.append(" or ")
+        self.children[1].write(parts)
+
+
+class Not(Node):
+    __slots__ = ("children",)
+
+    def __init__(self, child: Node) -> None:
+        self.children = [child]
+
+    def write(self, parts: list[str]) -> None:
+        parts.append("not ")
+        self.children[0].write(parts)
+
+
+class Group(Node):
+    __slots__ = ("children",)
+
+    def __init__(self, child: Node) -> None:
+        self.children = [child]
+
+    def write(self, parts: list[str]) -> None:
+        parts.append("( ")
+        self.children[0].write(parts)
+        parts.append(" )")
+
+
+class Macro(Node):
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def write(self, parts: list[str]) -> None:
+        parts.append(self.name)
+
+
+class Set(Node):
+    __slots__ = ("elements",)
+
+    def __init__(self, elements: list[Value]) -> None:
+        self.elements = elements
+
+    def write(self, parts: list[str]) -> None:
+        parts.append("(")
+        parts.append(", ".join(str(element.value) for element in self.elements))
+        parts.append(")")
+
+
+class Pred(Node):
+    """
+    A predicate. The field is an interned string such as "evt.type" or "proc.aname[2]",
+    the operator a Value such as Value("EQ", "="), and the value a Value, a Set,
+    or None for exists.
+    """
+    __slots__ = ("field", "op", "value")
+
+    def __init__(self, field: str, op: Value, value: Value | Set = None) -> None:
+        self.field = field
+        self.op = op
+        self.value = value
+
+    def write(self, parts: list[str]) -> None:
+        parts.append(self.field)
+        parts.append(" ")
+        parts.append(self.op.value)
+        if isinstance(self.value, Set):
+            parts.append(" ")
+            self.value.write(parts)
+        elif self.value is not None:
+            parts.append(" ")
+            parts.append(str(self.value.value))
+
+
+BINARY = {"and_op": And, "or_op": Or}
+UNARY = {"not_op": Not, "group": Group, "_rule": Rule}
+FIELDS: dict[str, str] = {}
+
+
+def intern_field(field: str) -> str:
+    return FIELDS.setdefault(field, field)
+
+
+def from_lark(tree: Tree | Token) -> Node:
+    """Convert a Lark condition tree into a compact AST.
+    """
+    if isinstance(tree, Token):
+        if tree.type == "MACRO":
+            return Macro(str(tree))
+        raise ValueError(f"Unexpected token {tree.type}")
+
+    if tree.data in BINARY:
+        return BINARY[tree.data](from_lark(tree.children[0]), from_lark(tree.children[1]))
+
+    if tree.data in UNARY:
+        return UNARY[tree.data](from_lark(tree.children[0]))
+
+    if tree.data == "pred":
+        field, op = tree.children[0], tree.children[1]
+        name = ".".join(str(token) for token in field.children if token.type != "INDEX")
+        name += "".join(str(token) for token in field.children if token.type == "INDEX")
+        value = None
+        if len(tree.children) > 2:
+            value = tree.children[2]
+            if isinstance(value, Tree):
+                value = Set([Value(token.type, token.value) for token in value.children])
+            else:
+                value = Value(value.type, value.value)
+        return Pred(intern_field(name), Value(op.type, op.value), value)
+
+    raise ValueError(f"Unknown node {tree.data}")
+
+
+def to_lark(node: Node) -> Tree | Token:
+    """Convert a compact AST back into a Lark condition tree.
+    """
+    if isinstance(node, Macro):
+        return Token("MACRO", node.name)
+
+    if isinstance(node, Pred):
+        name, _, index = node.field.partition("[")
+        class_, *subclasses = name.split(".")
+        field = [Token("CLASS", class_)] + [Token("SUBCLASS", subclass) for subclass in subclasses]
+        if index:
+            field.append(Token("INDEX", f"[{index}"))
+
+        children = [Tree("field", field), Token(node.op.type, node.op.value)]
+        if isinstance(node.value, Set):
+            children.append(Tree("set", [Token(element.type, element.value) for element in node.value.elements]))
+        elif node.value is not None:
+            children.append(Token(node.value.type, node.value.value))
+        return Tree("pred", children)
+
+    for data, node_class in list(BINARY.items()) + list(UNARY.items()):
+        if type(node) is node_class:
+            return Tree(data, [to_lark(child) for child in node.children])
+
+    raise ValueError(f"Unknown node {type(node).__name__}")
+
+
+def walk(node: Node):
+    """Iterate over nodes in pre-order.
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.children))
+
@@ -1,23 +1,36 @@
 import os
+import re
+from functools import cached_property
 
 from lark import Lark, Transformer, Tree, Token, v_args
 from lark.reconstruct import Reconstructor
 from entities import Macros, Lists
+from falco_ast import Node
 
 
 class ExpandMarcos(Transformer):
     def __init__(self, macros: Macros, parser: 'FalcoParser') -> None:
+        """
+        Replace macro references with their fully expanded condition subtrees.
+        Each macro is parsed and expanded once and cached by name, and every reference
+        shares the cached subtree. Expanded trees must therefore be treated as immutable:
+        transformers build new nodes, anything editing in place has to copy first.
+        """
         super().__init__()
         self.macros = macros
         self.parser = parser
+        self.cache: dict[str, Tree | Token] = {}
 
     @v_args(tree=True)
     def MACRO(self, name: str):
-        macro = self.macros[name]
-        subtree: Tree = self.parser.to_tree(macro)
-        subtree = self.transform(subtree)
-        assert len(subtree.children) == 1
-        return subtree.children[-1]
+        if name not in self.cache:
+            macro = self.macros[name]
+            subtree: Tree = self.parser.to_tree(macro)
+            subtree = self.transform(subtree)
+            assert len(subtree.children) == 1
+            self.cache[name] = subtree.children[-1]
+
+        return self.cache[name]
     
 
 class ExpandLists(Transformer):
@@ -68,24 +81,279 @@ class ExpandLists(Transformer):
         return tree
     
 
+class FastParseError(ValueError):
+    pass
+
+
+class FastParser:
+    """
+    Recursive-descent parser for the unambiguous subset of falco_grammar.txt.
+    Produces the same trees as the Earley parser in linear time, and raises FastParseError
+    for anything outside that subset so the caller can fall back to Earley:
+    mixed and/or chains without parentheses, a leading not in a chain, and
+    unusual spacing around keywords or set elements.
+    """
+    FIELD = re.compile(r"([a-z0-9]+)((?:\.[a-z0-9_]+)+)(\[[0-9]+\])?")
+    IDENTIFIER = re.compile(r"[_a-zA-Z][_a-zA-Z0-9]*")
+    UNQUOTED_STRING = re.compile(r"[a-zA-Z0-9_\.\/\\\-<>:\[\]]+")
+    SINGLE_QUOTED_STRING = re.compile(r"'[^']*'")
+    DOUBLE_QUOTED_STRING = re.compile(r'"([^"\\]*(\\.[^"\\]*)*)"')
+    NUMBER = re.compile(r"[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?")
+    KEYWORDS = ("and", "or", "not")
+    OPERATORS = [
+        ("!=", "NEQ"), ("<=", "LEQ"), (">=", "GEQ"), ("=", "EQ"), ("<", "LS"), (">", "GTR"),
+        ("icontains", "ICONTAINS"), ("contains", "CONTAINS"), ("startswith", "STARTSWITH"),
+        ("endswith", "ENDSWITH"), ("glob", "GLOB"), ("regex", "REGEX")
+    ]
+    SET_OPERATORS = [("intersects", "INTERSECTS"), ("in", "IN"), ("pmatch", "PMATCH")]
+
+    def parse(self, rule: str) -> Tree:
+        self.text = rule
+        self.pos = 0
+        tree = self._rule()
+        if self.pos != len(self.text):
+            self._fail("trailing input")
+        return Tree("_rule", [tree])
+
+    def _fail(self, reason: str):
+        raise FastParseError(f"{reason} at {self.pos}")
+
+    def _skip_spaces(self) -> None:
+        while self.pos < len(self.text) and self.text[self.pos] == " ":
+            self.pos += 1
+
+    def _keyword(self, keywords: tuple[str, ...]) -> str:
+        """Match a keyword followed by a space or an opening parenthesis.
+        """
+        for keyword in keywords:
+            end = self.pos + len(keyword)
+            if self.text.startswith(keyword, self.pos) and end < len(self.text) and self.text[end] in " (":
+                self.pos = end
+                return keyword
+        return None
+
+    def _rule(self) -> Tree:
+        operands = [self._operand()]
+        op = None
+
+        while True:
+            start = self.pos
+            self._skip_spaces()
+            keyword = self._keyword(("and", "or"))
+            if not keyword:
+                self.pos = start
+                break
+            if op and keyword != op:
+                self._fail("mixed and/or")
+            op = keyword
+            self._skip_spaces()
+            operands.append(self._operand())
+
+        if len(operands) > 1 and isinstance(operands[0], Tree) and operands[0].data == "not_op":
+            self._fail("leading not in chain")
+
+        tree = operands[0]
+        for operand in operands[1:]:
+            tree = Tree(f"{op}_op", [tree, operand])
+        return tree
+
+    def _operand(self):
+        if self._keyword(("not",)):
+            self._skip_spaces()
+            return Tree("not_op", [self._operand()])
+
+        if self.text.startswith("(", self.pos):
+            self.pos += 1
+            self._skip_spaces()
+            tree = self._rule()
+            self._skip_spaces()
+            if not self.text.startswith(")", self.pos):
+                self._fail("unclosed group")
+            self.pos += 1
+            return Tree("group", [tree])
+
+        match = self.FIELD.match(self.text, self.pos)
+        if match:
+            return self._pred(match)
+
+        match = self.IDENTIFIER.match(self.text, self.pos)
+        if not match or match.group() in self.KEYWORDS:
+            self._fail("expected operand")
+        self.pos = match.end()
+        return Token("MACRO", match.group())
+
+    def _pred(self, match: re.Match) -> Tree:
+        class_, subclasses, index = match.groups()
+        field = [Token("CLASS", class_)]
+        field.extend(Token("SUBCLASS", subclass) for subclass in subclasses[1:].split("."))
+        if index:
+            field.append(Token("INDEX", index))
+        self.pos = match.end()
+        self._skip_spaces()
+
+        if self._word("exists"):
+            return Tree("pred", [Tree("field", field), Token("EXISTS", "exists")])
+
+        for op, op_type in self.SET_OPERATORS:
+            if self._word(op):
+                self._skip_spaces()
+                return Tree("pred", [Tree("field", field), Token(op_type, op), self._set()])
+
+        for op, op_type in self.OPERATORS:
+            if self.text.startswith(op, self.pos):
+                self.pos += len(op)
+                self._skip_spaces()
+                return Tree("pred", [Tree("field", field), Token(op_type, op), self._value(boolean=True)])
+
+        self._fail("expected operator")
+
+    def _word(self, word: str) -> bool:
+        """Match a word operator that is not the prefix of a longer word.
+        """
+        end = self.pos + len(word)
+        if self.text.startswith(word, self.pos) and (end == len(self.text) or self.text[end] in " ()"):
+            self.pos = end
+            return True
+        return False
+
+    def _value(self, boolean: bool) -> Token:
+        for pattern, value_type in [
+            (self.SINGLE_QUOTED_STRING, "SINGLE_QUOTED_STRING"),
+            (self.DOUBLE_QUOTED_STRING, "DOUBLE_QUOTED_STRING"),
+            (self.UNQUOTED_STRING, None)
+        ]:
+            match = pattern.match(self.text, self.pos)
+            if match: break
+        else:
+            self._fail("expected value")
+
+        value = match.group()
+        if value_type is None:
+            if self.NUMBER.fullmatch(value):
+                value_type = "NUMBER"
+            elif boolean and value in ("true", "false"):
+                value_type = "BOOLEAN"
+            else:
+                value_type = "UNQUOTED_STRING"
+
+        self.pos = match.end()
+        if self.pos < len(self.text) and self.text[self.pos] not in " ),":
+            self._fail("unterminated value")
+        return Token(value_type, value)
+
+    def _set(self) -> Tree:
+        if not self.text.startswith("(", self.pos):
+            self._fail("expected set")
+        self.pos += 1
+        elements = []
+
+        while not self.text.startswith(")", self.pos):
+            elements.append(self._value(boolean=False))
+            if self.text.startswith(",", self.pos):
+                self.pos += 1
+                self._skip_spaces()
+            elif not self.text.startswith(")", self.pos):
+                self._fail("unclosed set")
+
+        self.pos += 1
+        return Tree("set", elements)
+
+
+class Serializer:
+    """
+    Write a condition tree back to a rule string in a single walk, with the same
+    spacing as the lark Reconstructor: "( x )" for groups, "(a, b)" for sets, and
+    single spaces around operators. Compact AST nodes write themselves in the same format.
+    """
+    def serialize(self, tree: Tree | Node) -> str:
+        parts = []
+        if isinstance(tree, Node):
+            tree.write(parts)
+        else:
+            self._write(tree, parts)
+        return "".join(parts)
+
+    def _write(self, node, parts: list[str]) -> None:
+        if isinstance(node, Token):
+            parts.append(str(node))
+            return
+
+        data = node.data
+        children = node.children
+
+        if data == "and_op" or data == "or_op":
+            self._write(children[0], parts)
+            parts.append(" and " if data == "and_op" else " or ")
+            self._write(children[1], parts)
+
+        elif data == "not_op":
+            parts.append("not ")
+            self._write(children[0], parts)
+
+        elif data == "group":
+            parts.append("( ")
+            self._write(children[0], parts)
+            parts.append(" )")
+
+        elif data == "pred":
+            self._write(children[0], parts)
+            for child in children[1:]:
+                parts.append(" ")
+                self._write(child, parts)
+
+        elif data == "field":
+            parts.append(".".join(str(child) for child in children if child.type != "INDEX"))
+            parts.extend(str(child) for child in children if child.type == "INDEX")
+
+        elif data == "set":
+            parts.append("(")
+            parts.append(", ".join(str(child) for child in children))
+            parts.append(")")
+
+        elif data == "_rule":
+            for child in children:
+                self._write(child, parts)
+
+        else:
+            raise ValueError(f"Unknown node {data}")
+
+
 class FalcoParser:
-    def __init__(self, grammar_path: str = None):
+    def __init__(self, grammar_path: str = None, fast: bool = True):
         """
         Initializes Falco rule condition parser.
         Converts rule to syntax tree and vice versa.
+        With fast enabled, rules are parsed by FastParser first and by Earley only
+        when FastParser cannot guarantee an identical tree.
         """
         if not grammar_path:
             base_path = os.path.abspath(os.path.dirname(__file__))
             grammar_path = os.path.join(base_path, "falco_grammar.txt")
         
         self.grammar = open(grammar_path).read()
-        self.parser = Lark(self.grammar, start="_rule", parser='earley', lexer="dynamic", maybe_placeholders=False)
-        self.reconstructor = Reconstructor(self.parser)
+        self.serializer = Serializer()
+        self.fast_parser = FastParser() if fast else None
+
+    @cached_property
+    def parser(self) -> Lark:
+        """Earley parser, built on first use so warm starts that never parse skip it.
+        """
+        return Lark(self.grammar, start="_rule", parser='earley', lexer="dynamic", maybe_placeholders=False)
+
+    @cached_property
+    def reconstructor(self) -> Reconstructor:
+        return Reconstructor(self.parser)
 
     def to_tree(self, rule: str) -> Tree:
+        if self.fast_parser:
+            try:
+                return self.fast_parser.parse(rule)
+            except FastParseError:
+                pass
+
         tree = self.parser.parse(rule)
         return tree
 
-    def to_rule(self, tree: Tree) -> str:
-        rule = self.reconstructor.reconstruct(tree)
+    def to_rule(self, tree: Tree | Node) -> str:
+        rule = self.serializer.serialize(tree)
         return rule
\ No newline at end of file
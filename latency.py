@@ -0,0 +1,48 @@
+import math
+from collections import deque
+
+
+class LatencyTracker:
+    def __init__(
+        self,
+        quantile: float = 0.99,
+        margin: float = 0.5,
+        min_timeout: float = 1,
+        max_timeout: float = 30,
+        min_samples: int = 20,
+        window: int = 500
+    ) -> None:
+        """
+        Keep a running distribution of detection latencies per seed and derive alert timeouts.
+        Latencies are kept in a sliding window, so the timeout follows drift in Falco and
+        host load. Until a seed has min_samples latencies its timeout is max_timeout.
+
+        Args:
+            quantile: latency quantile the timeout is based on
+            margin: seconds added on top of the quantile
+            min_timeout: lower bound of the timeout in seconds
+            max_timeout: upper bound of the timeout in seconds, the fixed timeout it replaces
+            min_samples: latencies needed before the timeout adapts
+            window: number of most recent latencies kept per seed
+        """
+        self.quantile = quantile
+        self.margin = margin
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+        self.window = window
+        self.latencies: dict[str, deque[float]] = {}
+
+    def add(self, key: str, latency: float) -> None:
+        self.latencies.setdefault(key, deque(maxlen=self.window)).append(latency)
+
+    def timeout(self, key: str) -> float:
+        latencies = self.latencies.get(key, ())
+        if len(latencies) < self.min_samples:
+            return self.max_timeout
+
+        # Nearest-rank quantile
+        latencies = sorted(latencies)
+        rank = min(len(latencies) - 1, math.ceil(self.quantile * len(latencies)) - 1)
+        timeout = latencies[rank] + self.margin
+        return min(self.max_timeout, max(self.min_timeout, timeout))
@@ -1,7 +1,20 @@
 import os
+import csv
+import time
 import logging
+from typing import Callable
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
+
+from timing import TIMING_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pa = None
 
 
 @dataclass
@@ -13,38 +26,250 @@ class RQ1Entry:
     alert: bool
     time: float
     returncode: int
+    cached: bool = False
+    timings: dict[str, int] = field(default_factory=dict)
 
     def __str__(self):
-        return f"{self.round},{self.seed},{self.label},{self.length},{self.alert},{self.time},{self.returncode}"
+        return ",".join(str(value) for value in entry_row(self).values())
 
 
 @dataclass
 class RQ2Entry:
     n: int
     exclude: list
+    round: int
     seed: str
     label: str
     length: int
     alert: bool
     time: float
     returncode: int
+    cached: bool = False
+    timings: dict[str, int] = field(default_factory=dict)
 
     def __str__(self) -> str:
-        exclude = ";".join(self.exclude)
-        return f"{self.n},{exclude},{self.seed},{self.label},{self.length},{self.alert},{self.time},{self.returncode}"
+        return ",".join(str(value) for value in entry_row(self).values())
+
+
+def entry_columns(entry_type: type) -> list[str]:
+    """Columns of an entry type: its fields, with the timings spread over TIMING_COLUMNS.
+    """
+    columns = [f.name for f in fields(entry_type) if f.name != "timings"]
+    return columns + TIMING_COLUMNS
+
+
+def entry_row(entry: RQ1Entry | RQ2Entry) -> dict:
+    row = {}
+    for f in fields(entry):
+        value = getattr(entry, f.name)
+        if f.name == "timings":
+            row.update({column: value.get(column, -1) for column in TIMING_COLUMNS})
+        elif isinstance(value, (list, tuple)):
+            row[f.name] = ";".join(value)
+        else:
+            row[f.name] = value
+    return row
+
+
+def entry_schema(entry_type: type) -> 'pa.Schema':
+    types = {int: pa.int64(), float: pa.float64(), bool: pa.bool_(), str: pa.string(), list: pa.string()}
+    schema = [(f.name, types[f.type]) for f in fields(entry_type) if f.name != "timings"]
+    return pa.schema(schema + [(column, pa.int64()) for column in TIMING_COLUMNS])
+
+
+class EntryWriter:
+    FORMATS = {"arrow": ".arrow", "parquet": ".parquet", "csv": ".csv"}
+
+    def __init__(
+        self, 
+        path: str, 
+        entry_type: type, 
+        format: str = "arrow", 
+        batch_size: int = 1000, 
+        flush_interval: float = 10,
+        resume: bool = False,
+        on_flush: Callable[[], None] = None
+    ) -> None:
+        """
+        Buffer entries and write them out in batches.
+        Arrow entries go to an IPC stream, one record batch per flush, so everything up to
+        the last flush can be read back even if the campaign is killed. Parquet entries go
+        to a directory of part files, one complete file per flush, since a Parquet file
+        cut short by a crash has no footer and cannot be read at all. Without pyarrow, or
+        with format="csv", batches are appended to a CSV file.
+
+        Once mark() has been called, a flush only writes the entries buffered before the
+        last mark, i.e. those of finished cases, and then calls on_flush. This keeps the
+        file in step with a Checkpoint.
+
+        Args:
+            path: path of the entries file without extension
+            entry_type: RQ1Entry or RQ2Entry, which fixes the columns
+            format: "arrow", "parquet" or "csv"
+            batch_size: buffered entries that trigger a flush
+            flush_interval: seconds since the last flush that trigger a flush on the next entry
+            resume: keep the entries already in the file and append to them
+            on_flush: called after every flush
+        """
+        if format not in self.FORMATS:
+            raise ValueError(f"Unknown entries format {format}")
+        if pa is None:
+            format = "csv"
+
+        self.format = format
+        self.path = path + self.FORMATS[format]
+        self.columns = entry_columns(entry_type)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.buffer: list[dict] = []
+        self.marked: int = None
+        self.closed = False
+        self.last_flush = time.monotonic()
+
+        resume = resume and os.path.exists(self.path)
+        self.writer = None
+        if format == "csv":
+            if not resume:
+                with open(self.path, "w", newline="") as f:
+                    csv.writer(f).writerow(self.columns)
+        elif format == "parquet":
+            self.schema = entry_schema(entry_type)
+            os.makedirs(self.path, exist_ok=True)
+            # Parts are never rewritten, a resume adds parts after the existing ones
+            parts = parquet_parts(self.path)
+            if not resume:
+                for part in parts:
+                    os.remove(part)
+                parts = []
+            self.parts = len(parts)
+            if not parts:
+                # An empty first part keeps the schema readable before any flush
+                self._write_part(pa.Table.from_pylist([], schema=self.schema))
+        else:
+            self.schema = entry_schema(entry_type)
+            # Streams cannot be appended to, rewrite what they hold
+            existing = read_entries(self.path) if resume else None
+            # The existing entries may be memory-mapped, so they are copied to a new file
+            # that then replaces the old one
+            target = self.path if existing is None else self.path + ".resume"
+            self.writer = pa.ipc.new_stream(target, self.schema)
+            # The schema is only written with the first batch, write it now so a crash
+            # before the first flush still leaves a readable stream
+            self.writer.write_batch(pa.RecordBatch.from_pylist([], schema=self.schema))
+            if existing is not None:
+                self.writer.write_table(existing.cast(self.schema))
+                os.replace(target, self.path)
+
+    def write(self, entry: RQ1Entry | RQ2Entry) -> None:
+        self.buffer.append(entry_row(entry))
+        if len(self.buffer) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def mark(self) -> None:
+        """Mark the entries buffered so far as belonging to finished cases.
+        """
+        self.marked = len(self.buffer)
+
+    def flush(self) -> None:
+        count = len(self.buffer) if self.marked is None else self.marked
+        rows, self.buffer = self.buffer[:count], self.buffer[count:]
+        if self.marked is not None:
+            self.marked = 0
+
+        if rows:
+            if self.format == "csv":
+                with open(self.path, "a", newline="") as f:
+                    csv.DictWriter(f, self.columns).writerows(rows)
+            elif self.format == "parquet":
+                self._write_part(pa.Table.from_pylist(rows, schema=self.schema))
+            else:
+                self.writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=self.schema))
+        self.last_flush = time.monotonic()
+        if self.on_flush is not None:
+            self.on_flush()
+
+    def _write_part(self, table: 'pa.Table') -> None:
+        # Written under a hidden name and renamed, so a crash never leaves a partial part
+        name = f"part-{self.parts:05d}.parquet"
+        temp = os.path.join(self.path, f".{name}.tmp")
+        pa.parquet.write_table(table, temp)
+        os.replace(temp, os.path.join(self.path, name))
+        self.parts += 1
+
+    def close(self) -> None:
+        if self.closed: return
+        self.closed = True
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if self.format != "csv":
+            export_csv(self.path, os.path.splitext(self.path)[0] + ".csv")
+
+
+def read_entries(path: str) -> 'pa.Table':
+    """
+    Read an entries file written by EntryWriter.
+    A stream cut short by a crash yields the batches before the cut.
+    """
+    extension = os.path.splitext(path)[1]
+    if extension == ".parquet":
+        return pa.concat_tables([pa.parquet.read_table(part) for part in parquet_parts(path)])
+    if extension == ".csv":
+        return pa.csv.read_csv(path)
+
+    batches = []
+    with pa.ipc.open_stream(path) as reader:
+        try:
+            for batch in reader:
+                batches.append(batch)
+        except (pa.ArrowInvalid, OSError):
+            pass
+        return pa.Table.from_batches(batches, schema=reader.schema)
+
+
+def parquet_parts(path: str) -> list[str]:
+    """Part files of a Parquet entries directory, in the order they were written.
+    """
+    names = [name for name in os.listdir(path) if name.startswith("part-") and name.endswith(".parquet")]
+    names.sort(key=lambda name: int(name[len("part-"):-len(".parquet")]))
+    return [os.path.join(path, name) for name in names]
+
+
+def export_csv(path: str, csv_path: str) -> None:
+    """Export an entries file to CSV, with the columns of entries.csv.
+    """
+    table = read_entries(path)
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(table.column_names)
+        for batch in table.to_batches():
+            columns = [column.to_pylist() for column in batch.columns]
+            writer.writerows(zip(*columns))
 
 
 class Logger:
-    def __init__(self, name: str) -> None:
-        timestamp = datetime.now().strftime("%y%m%d-%H%M%S")
-        base_path = os.path.abspath(os.path.dirname(__file__))
-        self.logs_path = os.path.join(base_path, "logs", f"{timestamp}-{name}")
-        os.makedirs(self.logs_path)
+    def __init__(
+        self, 
+        name: str, 
+        entry_type: type = RQ1Entry, 
+        format: str = "arrow", 
+        logs_path: str = None, 
+        on_flush: Callable[[], None] = None
+    ) -> None:
+        # Reopen the logs of an interrupted campaign, or start new ones
+        resume = logs_path is not None
+        if not resume:
+            timestamp = datetime.now().strftime("%y%m%d-%H%M%S")
+            base_path = os.path.abspath(os.path.dirname(__file__))
+            logs_path = os.path.join(base_path, "logs", f"{timestamp}-{name}")
+        self.logs_path = logs_path
+        os.makedirs(self.logs_path, exist_ok=resume)
 
         # Entries
-        self.entries_path = os.path.join(self.logs_path, "entries.csv")
-        with open(self.entries_path, "w") as f:
-            f.write("round,seed,label,length,alert,time,returncode\n")
+        self.entries = EntryWriter(os.path.join(self.logs_path, "entries"), entry_type, format, resume=resume, on_flush=on_flush)
+        self.entries_path = self.entries.path
 
         # Logs
         self.logger = logging.getLogger(name)
@@ -64,10 +289,15 @@ class Logger:
         self.logger.info(message)
 
     def entry(self, entry: RQ1Entry | RQ2Entry):
-        with open(self.entries_path, "a") as f:
-            f.write(f"{str(entry)}\n")
+        self.entries.write(entry)
 
     def sample(self, filename: str, sample: str):
         sample_path = os.path.join(self.logs_path, f"{filename}.txt")
         with open(sample_path, "w") as f:
-            f.write(sample)
\ No newline at end of file
+            f.write(sample)
+
+    def mark(self):
+        self.entries.mark()
+
+    def close(self):
+        self.entries.close()
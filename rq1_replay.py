@@ -0,0 +1,107 @@
+import os
+import atexit
+import random
+
+from logger import Logger, RQ1Entry
+from falco_parser import FalcoParser
+from transform import InsertDeadSubtrees
+from equivalence import EquivalenceChecker
+from dedup import SeenSet, test_key
+from executor import ReplayJob, ReplayExecutor
+from utils import (
+    load_syscalls,
+    load_seeds_cached,
+    capture_attack,
+    remove_containers
+)
+
+base_path = os.path.abspath(os.path.dirname(__file__))
+rule_path = os.path.join(base_path, "falco_rules.yaml")
+seed_path = os.path.join(base_path, "falco_seed.txt")
+falco_path = os.path.join(base_path, "falco_binary")
+falco_config_path = os.path.join(base_path, "falco.yaml")
+syscalls_path = os.path.join(base_path, "syscalls", "x86_64.txt")
+cache_path = os.path.join(base_path, ".cache")
+traces_path = os.path.join(base_path, "traces")
+
+
+if __name__ == "__main__":
+    RNG_SEED = 42
+    ROUNDS = 10000
+    WORKERS = os.cpu_count()
+    STATIC_CHECK = True
+    DEDUP = True
+    SAMPLE_RNG = random.Random(RNG_SEED)
+    SYSCALLS = load_syscalls(syscalls_path)
+
+    logger = Logger("rq1-replay")
+    atexit.register(logger.close)
+    parser = FalcoParser()
+    mutator = InsertDeadSubtrees(SYSCALLS, iterations=(2, 10), p=0.1, seed=RNG_SEED)
+    checker = EquivalenceChecker(SYSCALLS)
+    seen = SeenSet(os.path.join(logger.logs_path, "seen.txt"))
+    seeds, blacklist_syscalls = load_seeds_cached(rule_path, seed_path, parser, cache_path)
+
+    # Capture stage: record each seed's attack once
+    os.makedirs(traces_path, exist_ok=True)
+    traces = {}
+    for seed_name, _ in seeds:
+        logger.log(f"Capturing {seed_name}")
+        trace_file = os.path.join(traces_path, f"{seed_name}.scap")
+        traces[seed_name] = capture_attack(seed_name, trace_file)
+        remove_containers()
+
+    def generate_jobs():
+        """Mutate and render test cases in round order, so the mutant sequence only depends on the seeds.
+        """
+        for i in range(ROUNDS):
+            seed_name, tree = SAMPLE_RNG.choice(seeds)
+            logger.log(f"Round {i+1}/{ROUNDS}: {seed_name}")
+
+            try:
+                tree_prime = mutator.transform(tree, blacklist_syscalls[seed_name])
+                rules = {"r": parser.to_rule(tree), "r'": parser.to_rule(tree_prime)}
+            except Exception as e:
+                logger.log(f"\tMutation failed: {e}")
+                continue
+
+            # Only replay mutants that are provably equivalent to the seed on every event type
+            if STATIC_CHECK and not checker.equivalent(tree, tree_prime):
+                logger.log(f"\tMutant not provably equivalent, skipped")
+                continue
+
+            # Skip mutants already replayed in an equivalent form
+            if DEDUP and not seen.add(test_key(tree, tree_prime)):
+                logger.log(f"\tDuplicate mutant, skipped")
+                continue
+
+            yield ReplayJob(round=i+1, seed=seed_name, rules=rules, trace_file=traces[seed_name])
+
+    # Replay stage: evaluate r and r' over the recorded traces in parallel
+    executor = ReplayExecutor(falco_path, falco_config_path, workers=WORKERS)
+    for result in executor.run(generate_jobs()):
+        job = result.job
+        logger.log(f"Finished round {job.round}: {job.seed}")
+
+        if result.error:
+            logger.log(f"\tReplay failed: \n{result.error}")
+
+        for label, rule in job.rules.items():
+            alert, alert_time = result.alerts[label]
+            alert_status = f"\033[0;32m{True}\033[0m" if alert else f"\033[0;31m{False}\033[0m"
+            logger.log(f"\tChecked events: [{label}] {alert_status} ({alert_time:.5f})")
+
+            # Record rules if they are interesting
+            if result.error or not alert:
+                logger.sample(filename=f"{job.round}-{label}.txt", sample=rule)
+
+            entry = RQ1Entry(
+                round=job.round,
+                seed=job.seed,
+                label=label,
+                length=len(rule),
+                alert=alert,
+                time=alert_time,
+                returncode=result.returncode
+            )
+            logger.entry(entry)
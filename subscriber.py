@@ -0,0 +1,131 @@
+import time
+import threading
+from datetime import datetime
+from dataclasses import dataclass
+
+import grpc
+import falco
+
+from latency import LatencyTracker
+
+
+@dataclass
+class Alert:
+    output: str
+    event_time: float
+    received: float
+    rawtime: int = None
+    received_ns: int = None
+
+
+class AlertSubscriber:
+    def __init__(self, endpoint: str = "unix:///run/falco/falco.sock", backoff: tuple[float, float] = (0.01, 0.5)) -> None:
+        """
+        Stay subscribed to Falco gRPC outputs for the whole campaign and index every alert.
+        A background thread drains the output stream into an index keyed by (rule, tag),
+        where the tag is the rule file named in the output (see write_rules). Only the first
+        alert per key is kept. The subscription is re-established whenever Falco restarts
+        or reloads, and Falco queues outputs meanwhile, so no alert is lost.
+
+        Args:
+            endpoint: gRPC endpoint of Falco
+            backoff: (initial, maximum) seconds between reconnection attempts
+        """
+        # Without an output format the client yields responses, sparing a JSON round trip
+        self.client = falco.Client(endpoint=endpoint)
+        self.backoff = backoff
+        self.index: dict[tuple[str, str], Alert] = {}
+        self.cond = threading.Condition()
+        self.closed = False
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def first(self, rule: str, tag: str, timeout: float) -> Alert | None:
+        """
+        Wait for the first alert of a rule with a tag.
+
+        Returns:
+            Alert: the alert, with the event timestamp, its evt.rawtime if the output has it,
+                and when it was received (monotonic and wall clock ns), or None if none came
+                before the timeout
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: (rule, tag) in self.index, timeout)
+            return self.index.get((rule, tag))
+
+    def alerts(
+        self, 
+        tag: str, 
+        rule_names: list[str] = ["r"], 
+        timeout: float = 30, 
+        tracker: LatencyTracker = None, 
+        key: str | dict[str, str] = None
+    ) -> dict[str, tuple[bool, float]]:
+        """
+        Wait until every rule has alerted or the timeout is reached, like get_alerts did.
+        Alert times are measured from the event to the moment of the call.
+
+        Args:
+            tag: rule file the rules were loaded from
+            rule_names: rules to wait for
+            timeout: seconds to wait in total
+            tracker: if given, records under key how long each alert was waited for
+            key: tracker key of all rules, or a dict mapping rule names to their keys
+
+        Returns:
+            dict: a dict mapping rule names to (alert, alert_time)
+        """
+        now = datetime.now().timestamp()
+        start = time.monotonic()
+        deadline = start + timeout
+        alerts = {rule_name: (False, -1) for rule_name in rule_names}
+
+        for rule_name in rule_names:
+            alert = self.first(rule_name, tag, max(0, deadline - time.monotonic()))
+            if alert is not None:
+                alerts[rule_name] = (True, now - alert.event_time)
+                if tracker is not None:
+                    rule_key = key.get(rule_name) if isinstance(key, dict) else key
+                    tracker.add(rule_key, max(0, alert.received - start))
+
+        return alerts
+
+    def clear(self, tag: str) -> None:
+        """Forget the alerts of a finished test case.
+        """
+        with self.cond:
+            for key in [key for key in self.index if key[1] == tag]:
+                del self.index[key]
+
+    def close(self) -> None:
+        self.closed = True
+
+    def _run(self) -> None:
+        delay = self.backoff[0]
+        while not self.closed:
+            try:
+                for response in self.client.sub():
+                    if self.closed: return
+                    self._add(response.rule, response.output, response.time.timestamp(), response.output_fields)
+                    delay = self.backoff[0]
+            except grpc.RpcError:
+                # Falco is (re)starting, subscribe again once it serves
+                pass
+
+            time.sleep(delay)
+            delay = min(delay * 2, self.backoff[1])
+
+    def _add(self, rule: str, output: str, event_time: float, output_fields: dict = None) -> None:
+        # Rule outputs end with "<rule file> <rule name>", the rule file is the tag
+        if not output.endswith(f" {rule}"): return
+        tag = output[:-len(rule) - 1].rsplit(" ", 1)[-1]
+        received, received_ns = time.monotonic(), time.time_ns()
+
+        rawtime = (output_fields or {}).get("evt.rawtime")
+        rawtime = int(rawtime) if rawtime is not None else None
+
+        with self.cond:
+            if (rule, tag) not in self.index:
+                self.index[(rule, tag)] = Alert(output, event_time, received, rawtime, received_ns)
+                self.cond.notify_all()
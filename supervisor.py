@@ -0,0 +1,138 @@
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import subprocess
+from collections import deque
+
+
+class FalcoSupervisor:
+    def __init__(self, falco_path: str, falco_config_path: str, timeout: float = 60, rule_files: list[str] = []) -> None:
+        """
+        Keeps one long-lived Falco process up and swaps its rules in place.
+        Falco watches a single rule file owned by the supervisor. New rules are copied
+        over it and applied with SIGHUP, which makes Falco reload its config and rules
+        without reinitializing the driver from scratch in a new process.
+
+        Args:
+            falco_path: path to the Falco binary
+            falco_config_path: path to the Falco .yaml config
+            timeout: seconds to wait for Falco to (re)start serving
+            rule_files: fixed rule files loaded before the swapped ones, e.g. shared macros
+        """
+        self.falco_path = falco_path
+        self.falco_config_path = falco_config_path
+        self.timeout = timeout
+        self.rule_files = list(rule_files)
+
+        self.rules_dir = tempfile.mkdtemp(prefix="falco-rules-")
+        self.rule_file = os.path.join(self.rules_dir, "rules.yaml")
+        os.chmod(self.rules_dir, 0o777)
+
+        self.process: subprocess.Popen = None
+        self.options: list[str] = None
+        self.logs = deque(maxlen=200)
+        self.generation = 0
+        self.exited = False
+        self.cond = threading.Condition()
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def returncode(self) -> int:
+        """Return code of the Falco process, 0 while it is still running.
+        """
+        if self.process is None or self.process.poll() is None:
+            return 0
+        return self.process.returncode
+
+    def load(self, rule_file: str, options: list[str] = []) -> None:
+        """
+        Make Falco run the rules in rule_file with the given command line options.
+        Falco is started if it is not running yet, restarted if the options changed
+        (command line options are not reapplied on reload), and hot-reloaded otherwise.
+        Returns once Falco serves again with the new ruleset.
+        """
+        self._copy_rules(rule_file)
+
+        if not self.running or options != self.options:
+            self.stop()
+            self._start(options)
+        else:
+            self._reload()
+
+    def stop(self) -> int:
+        """Stop Falco if it is running.
+        """
+        returncode = self.returncode
+        if self.running:
+            self.process.kill()
+            returncode = self.process.wait(5)
+        self.process = None
+        return returncode
+
+    def close(self) -> None:
+        self.stop()
+        shutil.rmtree(self.rules_dir, ignore_errors=True)
+
+    def _copy_rules(self, rule_file: str) -> None:
+        """Atomically replace the watched rule file, so Falco never reads a partial file.
+        """
+        staging_file = os.path.join(self.rules_dir, "rules.yaml.tmp")
+        shutil.copyfile(rule_file, staging_file)
+        os.chmod(staging_file, 0o777)
+        os.replace(staging_file, self.rule_file)
+
+    def _start(self, options: list[str]) -> None:
+        # Reloads are driven by SIGHUP only, the file watcher would trigger a second one
+        rule_options = [option for rule_file in self.rule_files + [self.rule_file] for option in ["-r", rule_file]]
+        falco_command = [
+            self.falco_path, "-c", self.falco_config_path, *rule_options,
+            "-o", "watch_config_files=false"
+        ] + options
+        with self.cond:
+            self.process = subprocess.Popen(falco_command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            self.options = list(options)
+            self.logs.clear()
+            self.generation = 0
+            self.exited = False
+
+        reader = threading.Thread(target=self._read_logs, args=(self.process,), daemon=True)
+        reader.start()
+        self._wait_generation(1)
+
+    def _reload(self) -> None:
+        generation = self.generation
+        self.process.send_signal(signal.SIGHUP)
+        self._wait_generation(generation + 1)
+
+    def _read_logs(self, process: subprocess.Popen) -> None:
+        """
+        Drain Falco stderr for the lifetime of the process.
+        Every "Starting gRPC server" line marks a (re)load that finished with the current rules.
+        """
+        for line in process.stderr:
+            with self.cond:
+                if process is not self.process: return
+                self.logs.append(line)
+                if "Starting gRPC server" in line:
+                    self.generation += 1
+                    self.cond.notify_all()
+
+        with self.cond:
+            if process is not self.process: return
+            self.exited = True
+            self.cond.notify_all()
+
+    def _wait_generation(self, generation: int) -> None:
+        with self.cond:
+            ready = self.cond.wait_for(lambda: self.generation >= generation or self.exited, self.timeout)
+            logs = "".join(self.logs)
+
+        if self.generation < generation:
+            self.stop()
+            reason = "exited" if ready else "timed out"
+            raise ChildProcessError(f"Falco {reason} before loading rules\n{logs}")
@@ -0,0 +1,56 @@
+import time
+from contextlib import contextmanager
+
+STAGES = ("mutate", "serialize", "write", "launch", "ready", "attack", "alert", "teardown")
+TIMING_COLUMNS = [f"{stage}_ns" for stage in STAGES] + ["event_ns", "detect_ns"]
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        """
+        Time the stages of a test case with perf_counter_ns.
+        A stage entered several times (e.g. a confirmation attack) accumulates.
+        Attack start and end are also kept on the wall clock in nanoseconds, so they can be
+        compared with Falco's raw event timestamps (evt.rawtime).
+        """
+        self.durations: dict[str, int] = {}
+        self.attack_start_ns = None
+        self.attack_end_ns = None
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0) + time.perf_counter_ns() - start
+
+    @contextmanager
+    def attack(self):
+        if self.attack_start_ns is None:
+            self.attack_start_ns = time.time_ns()
+        try:
+            with self.stage("attack"):
+                yield
+        finally:
+            self.attack_end_ns = time.time_ns()
+
+    def timings(self, rawtime: int = None, received_ns: int = None) -> dict[str, int]:
+        """
+        Timing columns of one rule's entry.
+
+        Args:
+            rawtime: evt.rawtime of the rule's first alert
+            received_ns: wall clock time the alert was received
+
+        Returns:
+            dict: stage durations, plus event_ns (event time after attack start) and
+                detect_ns (event to alert delivery) when the rule alerted
+        """
+        timings = {f"{stage}_ns": duration for stage, duration in self.durations.items()}
+        if rawtime is not None:
+            if self.attack_start_ns is not None:
+                timings["event_ns"] = rawtime - self.attack_start_ns
+            if received_ns is not None:
+                timings["detect_ns"] = received_ns - rawtime
+        return timings
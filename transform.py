@@ -1,150 +1,157 @@
 import random
 
-from lark import Tree, Token, Visitor, Transformer, v_args
+from lark import Tree
 
+from falco_ast import Node, And, Or, Not, Group, Pred, Set, Value, from_lark, to_lark, walk
 
-class ExtractSyscalls(Visitor):
+
+class ExtractSyscalls:
     def __init__(self) -> None:
         """
         Extract all syscalls present in the rule.
         We approach conservatively by assuming every syscall present is used.
         """
-        super().__init__()
         self.syscalls = set()
 
-    def visit(self, tree: Tree) -> set[str]:
-        super().visit(tree)
+    def visit(self, tree: Node | Tree) -> set[str]:
+        if isinstance(tree, Tree):
+            tree = from_lark(tree)
+
+        for node in walk(tree):
+            # An event type (syscall) field must be evt.type
+            if isinstance(node, Pred) and node.field == "evt.type":
+                self._extract_syscalls(node.value)
         return self.syscalls
-        
-    def pred(self, tree: Tree) -> Tree:
-        """Check predicate nodes
-        """
-        field = tree.children[0]
-        value = tree.children[-1]
-
-        # An event type (syscall) field must be evt.type
-        if (
-            len(field.children) == 2
-            and isinstance(field.children[0], Token)
-            and isinstance(field.children[1], Token)
-            and field.children[0].value == "evt"
-            and field.children[1].value == "type"
-        ):
-            self._extract_syscalls(value)
-
-    def _extract_syscalls(self, item) -> None:
+
+    def _extract_syscalls(self, value: Value | Set) -> None:
         """
-        Recursively get all syscalls from tokens in the right operand.
+        Get all syscalls from the right operand.
         All unquoted strings are potential syscalls.
         """
-        if isinstance(item, Token):
-            if item.type == "UNQUOTED_STRING": 
+        values = value.elements if isinstance(value, Set) else [value]
+        for item in values:
+            if item is not None and item.type == "UNQUOTED_STRING":
                 self.syscalls.add(item.value)
-            return
 
-        if isinstance(item, Tree):
-            for child in item.children:
-                self._extract_syscalls(child)
 
+class InsertDeadSubtrees:
+    MUTABLE = (Pred, And, Or)
+    EVT_TYPE = "evt.type"
+    EQ = Value("EQ", "=")
+    NEQ = Value("NEQ", "!=")
+    IN = Value("IN", "in")
 
-class InsertDeadSubtrees(Transformer):
     def __init__(self, syscalls: set[str], iterations: tuple[int, int], p: float, seed: int) -> None:
         """Tranform a rule tree by randomly adding dead subtrees.
 
+        Keeps an index of mutable nodes (pred, and_op, or_op) and edits the tree in place,
+        so each iteration costs O(k) for k insertions instead of a full tree rebuild.
+        All randomness comes from one generator, so mutants are reproducible from seed.
+
         Args:
             syscalls: vocabulary of all syscalls
             iterations: number of transformations in [min, max] range
             p: probability of adding subtree at each node
             seed: for random number generator
         """
-        super().__init__()
         self.rng = random.Random(seed)
         self.whitelist_syscalls = None
         self.syscalls = syscalls
+        self.syscall_values = {syscall: Value("UNQUOTED_STRING", syscall) for syscall in syscalls}
         self.min_iter, self.max_iter = iterations
         self.p = p
 
-    def transform(self, tree: Tree, blacklist_syscalls: set[str]) -> Tree:
+    def transform(self, tree: Node | Tree, blacklist_syscalls: set[str]) -> Node | Tree:
         """
         Args:
-            tree: the tree to transform
+            tree: the tree to transform, left unchanged. Lark trees are converted to
+                the compact AST and back, so the result has the same type as the input
             blacklist_syscalls: syscalls that should not be used in dead subtrees
 
         Returns:
-            Tree: transformed tree
+            Node | Tree: transformed tree
         """
-        self.whitelist_syscalls = list(self.syscalls.difference(blacklist_syscalls))
-        iterations = random.randint(self.min_iter, self.max_iter)
+        if isinstance(tree, Tree):
+            return to_lark(self.transform(from_lark(tree), blacklist_syscalls))
+
+        self.whitelist_syscalls = sorted(self.syscalls.difference(blacklist_syscalls))
+        iterations = self.rng.randint(self.min_iter, self.max_iter)
+
+        # Only children lists are edited, so copying them is enough to leave the seed intact
+        tree = self._copy(tree)
+        index = list(self._walk(tree.children, 0))
 
         for _ in range(iterations):
-            tree = super().transform(tree)
+            # Each node independently gets a subtree with probability p
+            k = self.rng.binomialvariate(len(index), self.p)
+            for i in self.rng.sample(range(len(index)), k):
+                self._add_subtree(index, i)
 
         return tree
 
-    @v_args(tree=True)
-    def pred(self, tree: Tree) -> Tree:
-        return self._add_subtree(tree)
+    def _copy(self, node: Node) -> Node:
+        if not node.children:
+            return node
+        copy = object.__new__(type(node))
+        copy.children = [self._copy(child) for child in node.children]
+        return copy
 
-    @v_args(tree=True)
-    def and_op(self, tree: Tree) -> Tree:
-        return self._add_subtree(tree)
-
-    @v_args(tree=True)
-    def or_op(self, tree: Tree) -> Tree:
-        return self._add_subtree(tree)
-    
-    def _add_subtree(self, x: Tree) -> Tree:
+    def _walk(self, holder: list[Node], position: int):
+        """
+        Yield (holder, position) slots of mutable nodes in pre-order,
+        where holder[position] is the node, so it can be replaced in place.
+        """
+        stack = [(holder, position)]
+        while stack:
+            holder, position = stack.pop()
+            node = holder[position]
+            if isinstance(node, self.MUTABLE):
+                yield holder, position
+            children = node.children
+            stack.extend((children, j) for j in reversed(range(len(children))))
+
+    def _add_subtree(self, index: list[tuple[list[Node], int]], i: int) -> None:
         """
         0.5 * p% chance of inserting dead OR subtree
         0.5 * p% chance of inserting dead AND subtree
+
+        The node at index[i] is replaced by a group around the new operator.
+        Groups keep Falco's and/or precedence intact when the condition is serialized.
         """
-        if self.rng.random() > self.p: return x
-        op = "or_op" if self.rng.random() > 0.5 else "and_op"
+        holder, position = index[i]
+        x = holder[position]
+        or_op = self.rng.random() > 0.5
         add_pred = self.rng.choice([
             self._add_eq_pred,
             self._add_set_pred
         ])
-        children = [add_pred(op == "or_op"), x]
+        dead = add_pred(or_op)
+        children = [dead, Group(x) if not isinstance(x, Pred) else x]
         self.rng.shuffle(children)
-        return Tree(op, children)
-    
-    def _add_eq_pred(self, or_op: bool) -> Tree:
-        ops = Token("EQ", "=") if or_op else Token("NEQ", "!=") 
+
+        op_node = Or(*children) if or_op else And(*children)
+        holder[position] = Group(op_node)
+
+        x_position = 1 if children[0] is dead else 0
+        dead_position = 1 - x_position
+        index[i] = (holder[position].children, 0)
+        index.append((op_node.children, x_position) if isinstance(x, Pred) else (op_node.children[x_position].children, 0))
+        index.extend(self._walk(op_node.children, dead_position))
+
+    def _add_eq_pred(self, or_op: bool) -> Pred:
+        op = self.EQ if or_op else self.NEQ
         syscall = self.rng.choice(self.whitelist_syscalls)
-        return Tree("pred", [
-            Tree("field", [
-                Token("CLASS", "evt"),
-                Token("SUBCLASS", "type")
-            ]),
-            ops,
-            Token('UNQUOTED_STRING', syscall)
-        ])
+        return Pred(self.EVT_TYPE, op, self.syscall_values[syscall])
 
-    def _add_is_pred(self, or_op: bool) -> Tree:
+    def _add_is_pred(self, or_op: bool) -> Pred:
         syscall = self.rng.choice(self.whitelist_syscalls)
-        return Tree("pred", [
-            Tree("field", [
-                Token("CLASS", "evt"),
-                Token("SUBCLASS", "type"),
-                Token("SUBCLASS", "is"),
-                Token("SUBCLASS", syscall)
-            ]),
-            Token("EQ", "="),
-            Token('NUMBER', 1 if or_op else 0)
-        ])
+        return Pred(f"evt.type.is.{syscall}", self.EQ, Value("NUMBER", 1 if or_op else 0))
 
-    def _add_set_pred(self, or_op: bool) -> Tree:
+    def _add_set_pred(self, or_op: bool) -> Pred | Not:
         k = self.rng.randint(1, len(self.whitelist_syscalls))
         syscalls = self.rng.sample(self.whitelist_syscalls, k)
-        pred = Tree("pred", [
-            Tree("field", [
-                Token("CLASS", "evt"),
-                Token("SUBCLASS", "type")
-            ]),
-            Token("IN", "in"),
-            Tree("set", [
-                Token('UNQUOTED_STRING', syscall)
-                for syscall in syscalls
-            ])
-        ])
-        return pred if or_op else Tree("not_op", [pred])
\ No newline at end of file
+        pred = Pred(self.EVT_TYPE, self.IN, Set([
+            self.syscall_values[syscall]
+            for syscall in syscalls
+        ]))
+        return pred if or_op else Not(pred)
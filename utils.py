@@ -1,19 +1,44 @@
+import os
 import re
 import json
+import pickle
+import hashlib
+import functools
 import time
 import signal
+import tempfile
 import subprocess
-from datetime import datetime
 
+import grpc
 import yaml
 import falco
+import lark
+import falco_ast
+import falco_parser
+import transform
+import entities
 import docker
 from lark import Tree
 
 from falco_parser import FalcoParser, ExpandMarcos, ExpandLists
+from transform import ExtractSyscalls
+from falco_ast import Node, from_lark
 from entities import FalcoRule, Rules, Macros, Lists
 
 
+# Label of every container that runs attacks, for bulk cleanup
+ATTACK_LABEL = "falco-fuzz.attack"
+# Macro that scopes rules to the attack container of an execution lane
+SCOPE_MACRO = "lane_scope"
+
+
+@functools.cache
+def docker_client() -> docker.DockerClient:
+    """Docker client shared by the whole process, so its connection pool is reused.
+    """
+    return docker.from_env()
+
+
 def load_syscalls(syscalls_path: str) -> set[str]:
     """Load syscall vocabulary from .txt file.
     """
@@ -74,50 +99,170 @@ def load_seeds(rule_path: str, seed_path: str, parser: FalcoParser) -> list[tupl
     
     rules, macros, lists = _import_rules(rule_path)
     seed_names = open(seed_path).read().splitlines()
+    expand_macros = ExpandMarcos(macros, parser)
     seeds = {}
 
     for seed_name in seed_names:
         name = seed_name.split(".")[-1]
         rule = rules[name.lower()]
         tree: Tree = parser.to_tree(rule.condition)
-        tree = ExpandMarcos(macros, parser).transform(tree)
+        tree = expand_macros.transform(tree)
         tree = ExpandLists(lists).transform(tree)
         seeds[seed_name] = tree
 
     return list(seeds.items())
 
 
-def run_falco(falco_path: str, falco_config_path: str, rule_file: str, options: list[str] = []) -> subprocess.Popen:
-    """Run Falco.
+def load_seeds_cached(
+    rule_path: str, 
+    seed_path: str, 
+    parser: FalcoParser, 
+    cache_dir: str
+) -> tuple[list[tuple[str, Node]], dict[str, set[str]]]:
     """
-    falco_command = [falco_path, "-c", falco_config_path, "-r", rule_file] + options
+    Load seeds as compact ASTs and their syscall blacklists through an on-disk pickle cache.
+    The cache is keyed by content hashes of the rule file, seed file, grammar and the modules
+    that build the cached trees and blacklists (rule import and seed loading here, rule
+    entities, parser, macro and list expansion, AST, syscall extraction), and the lark
+    version, so a changed input or fix invalidates it.
+
+    Returns:
+        tuple: seeds as in load_seeds converted to falco_ast nodes, and a dict mapping seed
+            names to blacklisted syscalls
+    """
+    digest = hashlib.sha256()
+    sources = [__file__, entities.__file__, falco_ast.__file__, falco_parser.__file__, transform.__file__]
+    for path in [rule_path, seed_path, *sources]:
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    digest.update(hashlib.sha256(parser.grammar.encode()).digest())
+    digest.update(lark.__version__.encode())
+    cache_file = os.path.join(cache_dir, f"seeds-{digest.hexdigest()[:16]}.pickle")
+
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, "rb") as f:
+                return pickle.load(f)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            pass
+
+    seeds = [(name, from_lark(tree)) for (name, tree) in load_seeds(rule_path, seed_path, parser)]
+    blacklist_syscalls = {name: ExtractSyscalls().visit(tree) for (name, tree) in seeds}
+
+    # Write to a temp file first, so an interrupted write never leaves a truncated cache
+    os.makedirs(cache_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=cache_dir, delete=False) as tmp:
+        pickle.dump((seeds, blacklist_syscalls), tmp, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp.name, cache_file)
+
+    return seeds, blacklist_syscalls
+
+
+def run_falco(
+    falco_path: str, 
+    falco_config_path: str, 
+    rule_file: str, 
+    options: list[str] = [], 
+    rule_files: list[str] = []
+) -> subprocess.Popen:
+    """Run Falco, with rule_files loaded before rule_file. Use wait_ready to know when it can deliver alerts.
+    """
+    rule_options = [option for path in rule_files + [rule_file] for option in ["-r", path]]
+    falco_command = [falco_path, "-c", falco_config_path, *rule_options] + options
     falco_process = subprocess.Popen(falco_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    launch_logs = []
-    success = False
+    return falco_process
 
-    for line in falco_process.stderr:
-        launch_logs.append(line)
-        if "Starting gRPC server" in line:
-            success = True
+
+def wait_ready(
+    client: falco.Client, 
+    process: subprocess.Popen = None, 
+    socket_path: str = "/run/falco/falco.sock", 
+    timeout: float = 30, 
+    backoff: tuple[float, float] = (0.01, 0.5)
+) -> float:
+    """
+    Wait until Falco serves gRPC requests: poll for the unix socket, then probe the
+    server with a version request. Retries back off exponentially within [min, max] seconds.
+
+    Args:
+        client: Falco gRPC client bound to the socket
+        process: the Falco process, checked for early exits
+        socket_path: path of the gRPC unix socket
+        timeout: seconds before giving up
+        backoff: (min, max) delay between probes
+
+    Returns:
+        float: seconds waited
+    """
+    start = time.perf_counter()
+    delay, max_delay = backoff
+
+    while True:
+        if process and process.poll() is not None:
+            _, launch_logs = process.communicate()
+            raise ChildProcessError(launch_logs)
+
+        if os.path.exists(socket_path):
+            try:
+                client.version()
+                return time.perf_counter() - start
+            except grpc.RpcError:
+                pass
+
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError(f"Falco not ready after {timeout}s")
+
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+
+def stop_falco(
+    process: subprocess.Popen, 
+    socket_path: str = "/run/falco/falco.sock", 
+    timeout: float = 5, 
+    backoff: tuple[float, float] = (0.01, 0.5)
+) -> int:
+    """
+    Stop Falco and wait until it has exited and its gRPC socket is gone.
+    Falco is asked to terminate first so it can shut down its gRPC server, and killed on timeout.
+    A socket left behind after that is stale and removed.
+
+    Returns:
+        int: Falco return code
+    """
+    process.terminate()
+    try:
+        returncode = process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        returncode = process.wait(timeout)
+
+    start = time.perf_counter()
+    delay, max_delay = backoff
+
+    while os.path.exists(socket_path):
+        if time.perf_counter() - start > timeout:
+            os.remove(socket_path)
             break
 
-    if not success: 
-        falco_process.terminate()
-        raise ChildProcessError("\n".join(launch_logs))
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
 
-    return falco_process
+    return returncode
 
 
 def run_attack(rule_name: str):
-    """Run Falco event-generator attack that corresponds to a specific rule by name.
+    """
+    Run Falco event-generator attack that corresponds to a specific rule by name,
+    in a one-off container. EventGenerator runs attacks in a warm container instead.
     """
     success = False
-    client = docker.from_env()
-    client.containers.run("falcosecurity/event-generator")
+    client = docker_client()
     container = client.containers.run(
         image="falcosecurity/event-generator",
         command=["run", rule_name],
         name="falco-eventgen",
+        labels={ATTACK_LABEL: "falco-eventgen"},
         remove=True,
         detach=True,
         auto_remove=True,
@@ -125,71 +270,150 @@ def run_attack(rule_name: str):
         userns_mode="host"
     )
 
-    success = True
     attack_logs = []
     for line in container.logs(follow=True, stream=True):
-        attack_logs.append(line)
-        if "action executed" in line.decode('utf-8'):
+        attack_logs.append(line.decode("utf-8", errors="replace"))
+        if "action executed" in attack_logs[-1]:
             success = True
 
-    if not success: raise ChildProcessError("\n".join(line))
+    if not success: raise ChildProcessError("".join(attack_logs))
 
 
-def get_alerts(start_time: float, client: falco.Client, rule_file: str) -> tuple[bool, float]:
-    """Check alerts produced by Falco
+def capture_attack(rule_name: str, trace_file: str, sysdig_path: str = "sysdig", timeout: float = 30) -> str:
+    """
+    Record the event-generator attack for a rule into a .scap trace file, once.
+    Falco has no capture mode of its own in this version, so sysdig writes the trace.
+    An existing trace file is reused as is.
+
+    Args:
+        rule_name: event-generator action to run
+        trace_file: path of the .scap trace to write
+        sysdig_path: path to the sysdig binary
+        timeout: seconds to wait for sysdig to open and close the trace
+
+    Returns:
+        str: path of the trace file
     """
-    def _timeout(signum, frame):
-        raise TimeoutError()
+    if os.path.exists(trace_file):
+        return trace_file
+
+    partial_file = f"{trace_file}.part"
+    capture_process = subprocess.Popen(
+        [sysdig_path, "-w", partial_file], 
+        stdout=subprocess.DEVNULL, 
+        stderr=subprocess.PIPE, 
+        text=True
+    )
 
     try:
-        now = datetime.now()
-        alert_time = -1
-        alert = False
-        signal.signal(signal.SIGALRM, _timeout)
-        signal.alarm(30) 
-        for event in client.sub():
-            event: dict = json.loads(event)
-
-            if (event["rule"] == "r" and not alert and rule_file in event["output"]):
-                alert = True
-                event_time = event["output_fields"]['evt.time']
-                event_time = event_time[:event_time.index('.') + 7]
-                event_time = datetime.strptime(event_time, "%H:%M:%S.%f")
-                event_time = event_time.replace(year=now.year, month=now.month, day=now.day)  
-                alert_time = now.timestamp() - event_time.timestamp() # detect_time.timestamp() - start_time
-
-            if alert:
-                break
-
-    except TimeoutError:
-        pass
+        # sysdig writes the trace header as soon as the capture is open
+        start = time.perf_counter()
+        while not (os.path.exists(partial_file) and os.path.getsize(partial_file) > 0):
+            if capture_process.poll() is not None:
+                _, capture_logs = capture_process.communicate()
+                raise ChildProcessError(capture_logs)
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError(f"Capture not started after {timeout}s")
+            time.sleep(0.05)
+
+        run_attack(rule_name)
 
     finally:
-        signal.alarm(0)  
-
-    return alert, alert_time
-
-                
-def remove_containers():
-    """Remove all stopped falcosecurity/event-generator containers used in attacks.
-    """
-    result = subprocess.run(
-        [
-            "docker", "ps", "-a", "--filter", f"ancestor=falcosecurity/event-generator", 
-            "--format", "{{.ID}} {{.Image}} {{.Status}}"
-        ],
-        capture_output=True,
-        text=True,
-        check=True
-    )
-    
-    containers = result.stdout.strip().split('\n')
-    
-    for container_info in containers:
-        if container_info:
-            container_id, _, status = container_info.split(maxsplit=2)
-            
-            # Check if the container is stopped (status contains "Exited")
-            if "Exited" in status:
-                print(f"\tRemove {container_id}")
-                subprocess.run(["docker", "rm", container_id], stdout=subprocess.PIPE, check=True)
\ No newline at end of file
+        capture_process.send_signal(signal.SIGINT)
+        capture_process.wait(timeout)
+
+    os.replace(partial_file, trace_file)
+    return trace_file
+
+
+def replay_falco(
+    falco_path: str, 
+    falco_config_path: str, 
+    rule_file: str, 
+    trace_file: str, 
+    rule_names: list[str] = ["r"], 
+    options: list[str] = []
+) -> tuple[dict[str, tuple[bool, float]], int]:
+    """
+    Run Falco over a recorded trace file instead of the live kernel, until the trace ends.
+    Alerts are read as JSON from stdout and sorted by rule name, their time is measured 
+    from Falco launch until the alert is emitted.
+
+    Returns:
+        tuple: a dict mapping rule names to (alert, alert_time), and Falco return code
+    """
+    replay_options = [
+        "-o", "engine.kind=replay",
+        "-o", f"engine.replay.capture_file={trace_file}",
+        "-o", "json_output=true",
+        "-o", "stdout_output.enabled=true",
+        "-o", "grpc.enabled=false",
+        "-o", "grpc_output.enabled=false",
+        "-o", "watch_config_files=false",
+        "-o", "rule_matching=all"
+    ]
+    falco_command = [falco_path, "-c", falco_config_path, "-r", rule_file] + replay_options + options
+    alerts = {rule_name: (False, -1) for rule_name in rule_names}
+
+    with tempfile.TemporaryFile(mode="w+") as falco_logs:
+        start = time.perf_counter()
+        falco_process = subprocess.Popen(falco_command, stdout=subprocess.PIPE, stderr=falco_logs, text=True)
+
+        for line in falco_process.stdout:
+            if not line.startswith("{"): continue
+            event: dict = json.loads(line)
+            rule_name = event.get("rule")
+
+            if (rule_name in alerts and not alerts[rule_name][0] and rule_file in event.get("output", "")):
+                alerts[rule_name] = (True, time.perf_counter() - start)
+
+        returncode = falco_process.wait()
+        if returncode != 0:
+            falco_logs.seek(0)
+            raise ChildProcessError(falco_logs.read())
+
+    return alerts, returncode
+
+
+def write_scope(rule_file: str, container_name: str, macro: str = SCOPE_MACRO) -> None:
+    """Write a macro restricting rules to events of one container, loaded before scoped rules.
+    """
+    with open(rule_file, "w") as f:
+        f.write(yaml.dump([{"macro": macro, "condition": f"container.name = {container_name}"}], default_flow_style=False))
+
+
+def write_rules(rule_file: str, rules: dict[str, str], scope: str = None) -> None:
+    """
+    Write conditions into a single Falco .yaml rule file, one rule per entry.
+    Rule names must be unique, and each output is tagged with the rule file and
+    rule name so alerts from several rules in one Falco session can be told apart.
+    Outputs start with the raw event timestamp, so it shows up in the output fields.
+
+    Args:
+        rule_file: path to the .yaml rule file
+        rules: a dict mapping rule names to rule conditions
+        scope: condition (e.g. a macro) every rule is restricted to
+    """
+    rule_objs = [
+        {
+            "rule": name,
+            "desc": name,
+            "condition": condition if scope is None else f"( {condition} ) and {scope}",
+            "output": f"%evt.rawtime {rule_file} {name}",
+            "priority": "CRITICAL"
+        }
+        for name, condition in rules.items()
+    ]
+
+    with open(rule_file, "w") as f:
+        rule_yaml = yaml.dump(rule_objs, default_flow_style=False, width=float("inf"))
+        f.write(rule_yaml)
+
+
+def remove_containers(client: docker.DockerClient = None):
+    """Remove all stopped attack containers, found by their label, in one call.
+    """
+    client = client or docker_client()
+    result = client.containers.prune(filters={"label": ATTACK_LABEL})
+    for container_id in result.get("ContainersDeleted") or []:
+        print(f"\tRemove {container_id[:12]}")